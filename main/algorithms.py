@@ -1,13 +1,38 @@
 '''Algoritms for finding shortest path'''
 
-def bfs(graph, start, end):
+from collections import deque
+from heapq import heappop, heappush
+from math import hypot, sqrt
+from all_pairs import floyd_warshall_matrix
+from csr_graph import SearchState, as_csr
+from heaps import HEAPS
+
+
+class NegativeCycleError(ValueError):
+    """
+    Raised when a negative cycle is reachable from the start vertex, so
+    shortest paths are not defined. The cycle attribute lists its vertices
+    in edge order.
+    """
+
+    def __init__(self, cycle):
+        self.cycle = list(cycle)
+        super().__init__("Negative cycle: " + " -> ".join(map(str, self.cycle + self.cycle[:1])))
+
+    def __reduce__(self):
+        # Rebuild from the cycle, so the error survives a process pool.
+        return type(self), (self.cycle,)
+
+def bfs(graph, start, end, stats=None):
     """
-    param graph: dict, A dictionary where keys are tuple of nodes and values 
+    param graph: dict or CSRGraph, A dictionary where keys are tuple of nodes and values 
     
     param start: The starting node
     
     param end: The goal node
 
+    param stats: optional instrumentation.SearchStats to count the work into
+
     returns shortest path, which is presented in a 
     tuple (path: list of nodes, weight)
     
@@ -21,40 +46,88 @@ def bfs(graph, start, end):
         }, 1, 6)
     ([1, 3, 6], 4)
     """
+    csr = as_csr(graph)
+    if start not in csr.index or end not in csr.index:
+        return [], float('inf')
+    start, end = csr.index[start], csr.index[end]
 
-    priority_queue = [(0, [start])]
-    visited = {}
+    # Uniform-cost frontier: one heap entry per improvement and a parent
+    # pointer per vertex; the path is only materialised once, at the goal.
+    with csr.search_state() as state:
+        distances, parents = _dijkstra_search(csr, start, end, stats=stats, state=state)
+        if distances[end] == float('inf'):
+            return [], float('inf')
+        return csr.path_labels(_reconstruct_path(parents, start, end)), distances[end]
 
-    while priority_queue:
-        min_index = 0
-        for i in range(1, len(priority_queue)):
-            if priority_queue[i][0] < priority_queue[min_index][0]:
-                min_index = i
+def bfs_levels(graph, start, end, stats=None):
+    """
+    Level-synchronous breadth-first search for the path with the fewest
+    edges. Edge weights are ignored.
 
-        current_weight, path = priority_queue.pop(min_index)
-        node = path[-1]
+    param graph: dict or CSRGraph, A dictionary where keys are tuple of nodes and values 
 
-        if node == end:
-            return path, current_weight
+    param start: The starting node
 
-        if node in visited and visited[node] <= current_weight:
-            continue
-        visited[node] = current_weight
+    param end: The goal node
+
+    param stats: optional instrumentation.SearchStats to count the work into
 
-        for neighbor, weight in graph.get(node, []):
-            if neighbor not in path:
-                new_path = path + [neighbor]
-                priority_queue.append((current_weight + weight, new_path))
-    return [], float('inf')
+    returns path with the fewest edges, which is presented in a
+    tuple (path: list of nodes, number of edges)
+
+    >>> bfs_levels({1: [(2, 1), (3, 9)], 2: [(4, 1)], 3: [(4, 9)], 4: []}, 1, 4)
+    ([1, 2, 4], 2)
+    """
+    csr = as_csr(graph)
+    if start not in csr.index or end not in csr.index:
+        return [], float('inf')
+    start, end = csr.index[start], csr.index[end]
+    offsets, targets = csr.offsets, csr.targets
+
+    parents = [None] * len(csr)
+    parents[start] = start
+    frontier = [start]
+    while frontier and parents[end] is None:
+        if stats is not None:
+            # A level is pushed and popped as a whole.
+            stats.pushes += len(frontier)
+            stats.pops += len(frontier)
+            stats.expanded += len(frontier)
+            stats.relaxed += sum(offsets[vertex + 1] - offsets[vertex] for vertex in frontier)
+            stats.peak_frontier = max(stats.peak_frontier, len(frontier))
+        next_frontier = []
+        for vertex in frontier:
+            for neighbor in targets[offsets[vertex]:offsets[vertex + 1]]:
+                if parents[neighbor] is None:
+                    parents[neighbor] = vertex
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+
+    if parents[end] is None:
+        return [], float('inf')
+    path = _reconstruct_path(parents, start, end)
+    return csr.path_labels(path), len(path) - 1
 
-def dfs(graph, start, end):
+def dfs(graph, start, end, lower_bound=False, landmarks=None, stats=None):
     """
-    param graph: dict, A dictionary where keys are tuple of nodes and values 
+    Iterative depth-first branch and bound over simple paths.
+
+    param graph: dict or CSRGraph, A dictionary where keys are tuple of nodes and values 
     
     param start: The starting node
     
     param end: The goal node
 
+    param lower_bound: also prune a branch when its weight plus a lower
+    bound on the remaining distance reaches the best path found so far
+    (the hop-count bound used by astar)
+
+    param landmarks: optional landmarks.LandmarkIndex used as that lower
+    bound instead; implies lower_bound
+
+    param stats: optional instrumentation.SearchStats; the stack of the
+    current path is the frontier
+
     returns shortest path, which is presented in a 
     tuple (path: list of nodes, weight)
     >>> dfs({\
@@ -67,192 +140,689 @@ def dfs(graph, start, end):
         }, 1, 6)
     ([1, 3, 6], 4)
     """
-    visited = {}
-
-    def dfs_algorithm(node: int, path: list[int], weight: int) -> tuple[list[int], int] | None:
-        result = []
-        if node in visited and visited[node] <= weight:
-            return None
-
-        visited[node] = weight
-        path.append(node)
+    csr = as_csr(graph) if landmarks is None else landmarks.graph_for(graph)
+    if start not in csr.index or end not in csr.index:
+        return [], float('inf')
+    start, end = csr.index[start], csr.index[end]
+    if start == end:
+        return csr.path_labels([start]), 0
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+
+    # Cutting a branch at the best weight is only safe without negative edges.
+    bounded = csr.min_weight() >= 0
+    if landmarks is not None:
+        remaining = landmarks.heuristic(end)
+    elif lower_bound:
+        remaining = _min_steps_heuristic(csr.reverse(), end, csr.min_weight()).__getitem__
+    else:
+        remaining = None
+
+    best_path, best_weight = [], float('inf')
+    visited = [float('inf')] * len(csr)
+    on_path = bytearray(len(csr))
+
+    visited[start] = 0
+    on_path[start] = 1
+    path, path_weights, positions = [start], [0], [offsets[start]]
+    if stats is not None:
+        stats.pushes += 1
+        stats.expanded += 1
+        stats.relaxed += csr.degree(start)
+        stats.peak_frontier = max(stats.peak_frontier, 1)
+    while path:
+        node, position = path[-1], positions[-1]
+        if position == offsets[node + 1]:
+            path.pop()
+            path_weights.pop()
+            positions.pop()
+            on_path[node] = 0
+            if stats is not None:
+                stats.pops += 1
+            continue
+        positions[-1] = position + 1
 
-        if node == end:
-            result = (list(path), weight)
-        else:
-            result = None
-            for neighbor, edge_weight in graph.get(node, []):
-                if neighbor not in path:
-                    sub_result = dfs_algorithm(neighbor, path, weight + edge_weight)
-                    if sub_result:
-                        if result is None or sub_result[1] < result[1]:
-                            result = sub_result
+        neighbor = targets[position]
+        weight = path_weights[-1] + weights[position]
+        if on_path[neighbor] or visited[neighbor] <= weight:
+            continue
+        if bounded:
+            estimate = weight if remaining is None else weight + remaining(neighbor)
+            if estimate >= best_weight:
+                continue
+        visited[neighbor] = weight
+
+        if neighbor == end:
+            best_path, best_weight = path + [end], weight
+            continue
+        path.append(neighbor)
+        path_weights.append(weight)
+        positions.append(offsets[neighbor])
+        on_path[neighbor] = 1
+        if stats is not None:
+            stats.pushes += 1
+            stats.expanded += 1
+            stats.relaxed += csr.degree(neighbor)
+            stats.peak_frontier = max(stats.peak_frontier, len(path))
+
+    return csr.path_labels(best_path), best_weight
+
+def _reconstruct_path(previous, start, goal):
+    """
+    Walk predecessor links back from goal and return the path of node ids
+    from start to goal in O(path length).
+    """
+    path = [goal]
+    while path[-1] != start:
+        path.append(previous[path[-1]])
+    path.reverse()
+    return path
 
-        path.pop()
-        return result if result is not None else ([], float('inf'))
+def _predecessor_cycle(predecessor, vertex):
+    """
+    Walk predecessor links from vertex until a vertex repeats and return
+    that cycle in edge order.
+    """
+    seen = set()
+    while vertex not in seen:
+        seen.add(vertex)
+        vertex = predecessor[vertex]
+    cycle = [vertex]
+    current = predecessor[vertex]
+    while current != vertex:
+        cycle.append(current)
+        current = predecessor[current]
+    cycle.reverse()
+    return cycle
+
+# Largest weight for which heap='auto' picks Dial's buckets; with larger
+# weights most buckets are empty and scanning them costs more than the
+# radix heap's redistribution.
+DIAL_MAX_WEIGHT = 256
+
+
+def _choose_heap(csr):
+    """
+    The queue heap='auto' stands for: Dial's buckets for small
+    non-negative integer weights, the radix heap for larger non-negative
+    integers, heapq for anything else.
+    """
+    if csr.weight_typecode != 'q':
+        return 'binary'
+    low, high = csr.weight_range()
+    if low < 0:
+        return 'binary'
+    return 'dial' if high <= DIAL_MAX_WEIGHT else 'radix'
 
-    return dfs_algorithm(start, [], 0)
 
-def dijkstra(graph, start, goal):
+def _dial_search(csr, start, pending, state, stats):
+    """
+    Dijkstra with Dial's circular bucket queue: bucket d % (C + 1) holds
+    the vertices queued at distance d, C being the largest weight. All
+    queued distances lie in [current, current + C], so each bucket only
+    ever holds one distance. Buckets are drained in FIFO order (0-weight
+    edges append to the bucket being drained), and stale entries are
+    those whose vertex got closer since.
     """
-    param graph: dict, A dictionary where keys are tuple of nodes and values 
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    distances, previous, touch = state.distances, state.previous, state.touched.append
+    size = csr.weight_range()[1] + 1
+    buckets = [[] for _ in range(size)]
+    buckets[0].append(start)
+    queued = 1
+    current = -1
+    while queued:
+        current += 1
+        bucket = buckets[current % size]
+        for vertex in bucket:
+            queued -= 1
+            if stats is not None:
+                stats.pop(queued)
+            if distances[vertex] < current:
+                continue
+            if vertex in pending:
+                pending.discard(vertex)
+                if not pending:
+                    return distances, previous
+            lo, hi = offsets[vertex], offsets[vertex + 1]
+            for neighbor, weight in zip(targets[lo:hi], weights[lo:hi]):
+                new_distance = current + weight
+                if new_distance < distances[neighbor]:
+                    distances[neighbor] = new_distance
+                    previous[neighbor] = vertex
+                    touch(neighbor)
+                    buckets[new_distance % size].append(neighbor)
+                    queued += 1
+            if stats is not None:
+                stats.expand(hi - lo, queued)
+        bucket.clear()
+    return distances, previous
+
+
+def _radix_search(csr, start, pending, state, stats):
+    """
+    Dijkstra with a radix heap, which relies on popped keys never
+    decreasing: an entry with key d sits in bucket bit_length(d ^ last),
+    last being the latest minimum. When bucket 0 runs empty the first
+    non-empty bucket is split around its minimum, and every entry moves
+    to a lower bucket, so each is moved at most 64 times.
+    """
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    distances, previous, touch = state.distances, state.previous, state.touched.append
+    buckets = [[] for _ in range(65)]
+    buckets[0].append((0, start))
+    queued = 1
+    last = 0
+    while queued:
+        lowest = buckets[0]
+        if not lowest:
+            i = 1
+            while not buckets[i]:
+                i += 1
+            entries, buckets[i] = buckets[i], []
+            last = min(entries)[0]
+            for entry in entries:
+                buckets[(entry[0] ^ last).bit_length()].append(entry)
+        distance, vertex = lowest.pop()
+        queued -= 1
+        if stats is not None:
+            stats.pop(queued)
+        if distance > distances[vertex]:
+            continue
+        if vertex in pending:
+            pending.discard(vertex)
+            if not pending:
+                break
+        lo, hi = offsets[vertex], offsets[vertex + 1]
+        for neighbor, weight in zip(targets[lo:hi], weights[lo:hi]):
+            new_distance = distance + weight
+            if new_distance < distances[neighbor]:
+                distances[neighbor] = new_distance
+                previous[neighbor] = vertex
+                touch(neighbor)
+                buckets[(new_distance ^ last).bit_length()].append((new_distance, neighbor))
+                queued += 1
+        if stats is not None:
+            stats.expand(hi - lo, queued)
+    return distances, previous
+
+
+def _dijkstra_search(csr, start, goal=None, heap='auto', stats=None, state=None):
+    """
+    Dijkstra over node ids of a CSRGraph. goal is a node id, a set of node
+    ids or None; the search stops as soon as goal (every id of the set) is
+    settled, or runs to completion for None. Returns the distance and
+    predecessor lists.
+
+    heap='binary' uses heapq with lazy deletion of stale entries;
+    'dary' and 'pairing' use the addressable queues from heaps.py with
+    decrease-key, so every vertex is queued at most once. 'dial' and
+    'radix' are monotone integer queues for non-negative integer weights,
+    and 'auto' picks one of those when the weights allow (_choose_heap).
+
+    stats is an optional instrumentation.SearchStats. state is an optional
+    csr_graph.SearchState to search in (see CSRGraph.search_state); the
+    returned lists are then its own, valid until it is reset.
+    """
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    if state is None:
+        state = SearchState(len(csr))
+    distances, previous, touch = state.distances, state.previous, state.touched.append
+    distances[start] = 0
+    touch(start)
+    pending = set(goal) if isinstance(goal, (set, frozenset)) else {goal}
+
+    if stats is not None:
+        stats.pushes += 1
+
+    if heap == 'auto':
+        heap = _choose_heap(csr)
+    if heap in ('dial', 'radix'):
+        if _choose_heap(csr) == 'binary':
+            raise ValueError(f"heap={heap!r} needs non-negative integer weights")
+        search = _dial_search if heap == 'dial' else _radix_search
+        return search(csr, start, pending, state, stats)
+
+    if heap == 'binary':
+        settled = state.flags
+        queue = [(0, start)]
+        while queue:
+            distance, vertex = heappop(queue)
+            if stats is not None:
+                stats.pop(len(queue))
+            if settled[vertex]:
+                continue
+            settled[vertex] = 1
+            if vertex in pending:
+                pending.discard(vertex)
+                if not pending:
+                    break
+            lo, hi = offsets[vertex], offsets[vertex + 1]
+            for neighbor, weight in zip(targets[lo:hi], weights[lo:hi]):
+                new_distance = distance + weight
+                if new_distance < distances[neighbor]:
+                    distances[neighbor] = new_distance
+                    previous[neighbor] = vertex
+                    touch(neighbor)
+                    heappush(queue, (new_distance, neighbor))
+            if stats is not None:
+                stats.expand(hi - lo, len(queue))
+        return distances, previous
+
+    if heap not in HEAPS:
+        raise ValueError(f"Unknown heap: {heap}")
+    queue = HEAPS[heap](len(csr))
+    queue.push(0, start)
+    while queue:
+        distance, vertex = queue.pop()
+        if stats is not None:
+            stats.pop(len(queue))
+        if vertex in pending:
+            pending.discard(vertex)
+            if not pending:
+                break
+        lo, hi = offsets[vertex], offsets[vertex + 1]
+        for neighbor, weight in zip(targets[lo:hi], weights[lo:hi]):
+            new_distance = distance + weight
+            if new_distance < distances[neighbor]:
+                distances[neighbor] = new_distance
+                previous[neighbor] = vertex
+                touch(neighbor)
+                if neighbor in queue:
+                    queue.decrease(neighbor, new_distance)
+                else:
+                    queue.push(new_distance, neighbor)
+        if stats is not None:
+            stats.expand(hi - lo, len(queue))
+    return distances, previous
+
+def dijkstra(graph, start, goal, heap='auto', stats=None):
+    """
+    param graph: dict or CSRGraph, A dictionary where keys are tuple of nodes and values 
     
     param start: The starting node
     
     param end: The goal node
 
+    param heap: priority queue to use: 'binary' (heapq with lazy deletion),
+    'dary' (4-ary heap with decrease-key), 'pairing' (pairing heap),
+    'dial' (bucket queue) or 'radix' (radix heap); the last two need
+    non-negative integer weights. 'auto' uses Dial's buckets for integer
+    weights up to DIAL_MAX_WEIGHT, the radix heap for larger integers and
+    heapq otherwise
+
+    param stats: optional instrumentation.SearchStats to count the work into
+
     returns shortest path, which is presented in a 
     tuple (path: list of nodes, weight)
 
     >>> graph = {'A': [('B', 1), ('C', 1)], 'B': [('D', 1)], 'C': [('D', 1)], 'D': []}
     >>> dijkstra(graph, 'A', 'D')
     (['A', 'B', 'D'], 2)
+    >>> dijkstra(graph, 'A', 'D', heap='pairing')[1]
+    2
+    >>> [dijkstra(graph, 'A', 'D', heap=heap)[1] for heap in ('dial', 'radix')]
+    [2, 2]
     """
-    
-    distances = {vertex: float('infinity') for vertex in graph}
-    distances[start] = 0
+    csr = as_csr(graph)
+    if start not in csr.index or goal not in csr.index:
+        return [], float('infinity')
+    start, goal = csr.index[start], csr.index[goal]
 
-    previous_vertices = {vertex: None for vertex in graph}
+    with csr.search_state() as state:
+        distances, previous_vertices = _dijkstra_search(csr, start, goal, heap, stats, state)
+        if distances[goal] == float('infinity'):
+            return [], float('infinity')
 
-    unvisited = list(graph.keys())
+        path = _reconstruct_path(previous_vertices, start, goal)
+        return csr.path_labels(path), distances[goal]
 
-    while unvisited:
-        current_vertex = None
-        current_distance = float('infinity')
-        for vertex in unvisited:
-            if distances[vertex] < current_distance:
-                current_distance = distances[vertex]
-                current_vertex = vertex
+def _min_steps_heuristic(reverse_graph, goal, min_edge_weight):
+    """
+    Lower bound on the distance to goal for every vertex: the fewest edges
+    needed to reach goal times the smallest edge weight. reverse_graph is
+    searched from goal, so pass the reversed graph for a forward search
+    (and the graph itself for a search running towards the start).
+    """
+    min_steps = [float('infinity')] * len(reverse_graph)
+    min_steps[goal] = 0
 
-        if current_vertex is None:
-            break
+    queue = deque([goal])
 
-        if current_vertex == goal:
-            break
+    while queue:
+        current = queue.popleft()
+        for neighbor, _ in reverse_graph.neighbors(current):
+            if min_steps[neighbor] > min_steps[current] + 1:
+                min_steps[neighbor] = min_steps[current] + 1
+                queue.append(neighbor)
 
-        for neighbor, weight in graph[current_vertex]:
-            distance = distances[current_vertex] + weight
+    return [min_edge_weight * steps if steps != float('infinity') else float('infinity')
+            for steps in min_steps]
 
-            if distance < distances[neighbor]:
-                distances[neighbor] = distance
-                previous_vertices[neighbor] = current_vertex
+HEURISTICS = ('euclidean', 'manhattan', 'octile')
 
-        unvisited.remove(current_vertex)
 
-    path = []
-    current = goal
-    while previous_vertices[current] is not None:
-        path.insert(0, current)
-        current = previous_vertices[current]
-    if distances[goal] != float('infinity'):
-        path.insert(0, current)
+def _coordinate_heuristic(csr, goal, kind):
+    """
+    Distance estimate to goal from the node coordinates of csr. It is
+    admissible when no edge weighs less than the distance it covers in
+    that metric: euclidean for any embedding, manhattan for 4-connected
+    and octile for 8-connected grid maps. Nodes without coordinates
+    (NaN) get 0.
+    """
+    if kind not in HEURISTICS:
+        raise ValueError(f"Unknown heuristic: {kind}")
+    if csr.coords is None:
+        raise ValueError(f"heuristic='{kind}' needs node coordinates")
+    coords = csr.coords
+    goal_x, goal_y = coords[2 * goal], coords[2 * goal + 1]
+    diagonal = sqrt(2) - 2
+
+    def euclidean(u):
+        estimate = hypot(coords[2 * u] - goal_x, coords[2 * u + 1] - goal_y)
+        return estimate if estimate == estimate else 0.0
 
-    return path, distances[goal]
+    def manhattan(u):
+        estimate = abs(coords[2 * u] - goal_x) + abs(coords[2 * u + 1] - goal_y)
+        return estimate if estimate == estimate else 0.0
 
-def astar(graph, start, goal):
+    def octile(u):
+        dx, dy = abs(coords[2 * u] - goal_x), abs(coords[2 * u + 1] - goal_y)
+        estimate = dx + dy + diagonal * min(dx, dy)
+        return estimate if estimate == estimate else 0.0
+
+    return {'euclidean': euclidean, 'manhattan': manhattan, 'octile': octile}[kind]
+
+
+def astar(graph, start, goal, landmarks=None, heuristic=None, stats=None):
     """
-    param graph: dict, A dictionary where keys are tuple of nodes and values 
+    param graph: dict or CSRGraph, A dictionary where keys are tuple of nodes and values 
     
     param start: The starting node
     
     param end: The goal node
 
+    param landmarks: optional landmarks.LandmarkIndex built once for this
+    graph; its triangle-inequality bounds replace the per-query hop-count
+    heuristic
+
+    param heuristic: 'euclidean', 'manhattan' or 'octile' to estimate
+    distances from the CSRGraph's node coordinates instead (see
+    HEURISTICS); weights must be at least the distance an edge covers
+
+    param stats: optional instrumentation.SearchStats; only the A* search
+    itself is counted, not the heuristic precomputation
+
     returns shortest path, which is presented in a 
     tuple (path: list of nodes, weight)
 
     >>> graph = {'A': [('B', 1), ('C', 1)], 'B': [('D', 1)], 'C': [('D', 1)], 'D': []}
     >>> astar(graph, 'A', 'D')
     (['A', 'B', 'D'], 2)
+    >>> from landmarks import LandmarkIndex
+    >>> astar(graph, 'A', 'D', landmarks=LandmarkIndex(graph, count=2))
+    (['A', 'B', 'D'], 2)
+    >>> from generate_graph import grid_graph
+    >>> astar(grid_graph(4, 4), 0, 15, heuristic='manhattan')
+    ([0, 1, 2, 3, 7, 11, 15], 6)
     """
-    
-    def find_min_edge_weight(graph):
-        min_weight = float('infinity')
-        for neighbors in graph.values():
-            for neighbor, weight in neighbors:
-                if weight < min_weight:
-                    min_weight = weight
-        return min_weight if min_weight != float('infinity') else 0
-
-    min_edge_weight = find_min_edge_weight(graph)
-
-    def compute_min_steps(graph, goal):
-        reverse_graph = {vertex: [] for vertex in graph}
-        for vertex, neighbors in graph.items():
-            for neighbor, _ in neighbors:
-                reverse_graph[neighbor].append(vertex)
-        
-        min_steps = {vertex: float('infinity') for vertex in graph}
-        min_steps[goal] = 0
-        
-        queue = [goal]
-
-        while queue:
-            current = queue.pop(0)
-            for neighbor in reverse_graph[current]:
-                if min_steps[neighbor] > min_steps[current] + 1:
-                    min_steps[neighbor] = min_steps[current] + 1
-                    queue.append(neighbor)
-        
-        return min_steps
-
-    min_steps = compute_min_steps(graph, goal)
-
-    heuristic = {}
-    for vertex in graph:
-        if min_steps[vertex] != float('infinity'):
-            heuristic[vertex] = min_edge_weight * min_steps[vertex]
-        else:
-            heuristic[vertex] = float('infinity')
-
-    def a_star_with_heuristic(graph, start, goal, heuristic):
-        open_set = set([start])
-        closed_set = set()
-        g_scores = {vertex: float('infinity') for vertex in graph}
+    if landmarks is not None and heuristic is not None:
+        raise ValueError("Use either landmarks or heuristic, not both")
+    csr = as_csr(graph) if landmarks is None else landmarks.graph_for(graph)
+    if start not in csr.index or goal not in csr.index:
+        return None, float('infinity')
+    start, goal = csr.index[start], csr.index[goal]
+
+    if heuristic is not None:
+        heuristic = _coordinate_heuristic(csr, goal, heuristic)
+    elif landmarks is None:
+        heuristic = _min_steps_heuristic(csr.reverse(), goal, csr.min_weight()).__getitem__
+    else:
+        heuristic = landmarks.heuristic(goal)
+
+    def a_star_with_heuristic(csr, start, goal, heuristic, state):
+        closed_set, g_scores, came_from = state.flags, state.distances, state.previous
+        touch = state.touched.append
         g_scores[start] = 0
+        touch(start)
 
-        f_scores = {vertex: float('infinity') for vertex in graph}
-        f_scores[start] = heuristic[start]
+        open_heap = [(heuristic(start), start)]
+        if stats is not None:
+            stats.pushes += 1
 
-        came_from = {vertex: None for vertex in graph}
-
-        while open_set:
-            current = min(open_set, key=lambda vertex: f_scores[vertex])
+        while open_heap:
+            _, current = heappop(open_heap)
+            if stats is not None:
+                stats.pop(len(open_heap))
+            if closed_set[current]:
+                continue
 
             if current == goal:
-                path = []
-                while current:
-                    path.insert(0, current)
-                    current = came_from[current]
-                return path, g_scores[goal]
+                return csr.path_labels(_reconstruct_path(came_from, start, goal)), g_scores[goal]
 
-            open_set.remove(current)
-            closed_set.add(current)
+            closed_set[current] = 1
 
-            for neighbor, cost in graph[current]:
-                if neighbor in closed_set:
+            for neighbor, cost in csr.neighbors(current):
+                if closed_set[neighbor]:
                     continue
 
                 tentative_g = g_scores[current] + cost
+                if tentative_g >= g_scores[neighbor]:
+                    continue
 
-                if neighbor not in open_set:
-                    open_set.add(neighbor)
-                elif tentative_g >= g_scores[neighbor]:
+                estimate = heuristic(neighbor)
+                if estimate == float('infinity'):
                     continue
 
                 came_from[neighbor] = current
                 g_scores[neighbor] = tentative_g
-                f_scores[neighbor] = g_scores[neighbor] + heuristic.get(neighbor, float('infinity'))
+                touch(neighbor)
+                heappush(open_heap, (tentative_g + estimate, neighbor))
+
+            if stats is not None:
+                stats.expand(csr.degree(current), len(open_heap))
 
         return None, float('infinity')
 
-    path, distance = a_star_with_heuristic(graph, start, goal, heuristic)
+    with csr.search_state() as state:
+        path, distance = a_star_with_heuristic(csr, start, goal, heuristic, state)
 
     return path, distance
 
 
-def bellman_ford(graph, start, goal):
+def _bidirectional_search(csr, reverse_graph, start, goal, states, potential=None, stats=None):
+    """
+    Alternate a forward search from start on csr and a backward search
+    from goal on reverse_graph, always advancing the side with the smaller
+    queue. mu is the best start-goal distance seen through any edge that
+    connects the two searches; once the smallest keys of both queues add
+    up to at least mu no shorter path can exist.
+
+    potential is an optional list of A* potentials p(v); the forward
+    search orders vertices by d(v) + p(v) and the backward search by
+    d(v) - p(v), which keeps the same stopping rule valid. Vertices whose
+    potential is None cannot lie on a start-goal path and are skipped.
+
+    stats is an optional instrumentation.SearchStats; the frontier is
+    both queues together. states holds the forward and backward
+    csr_graph.SearchState.
+
+    Returns (path of node ids, distance).
+    """
+    infinity = float('infinity')
+    distances = tuple(state.distances for state in states)
+    parents = tuple(state.previous for state in states)
+    settled = tuple(state.flags for state in states)
+    touches = tuple(state.touched.append for state in states)
+    graphs = (csr, reverse_graph)
+    signs = (1, -1)
+    distances[0][start] = 0
+    distances[1][goal] = 0
+    touches[0](start)
+    touches[1](goal)
+    if potential is None:
+        queues = ([(0, start)], [(0, goal)])
+    else:
+        queues = ([(potential[start], start)], [(-potential[goal], goal)])
+
+    if stats is not None:
+        stats.pushes += 2
+
+    best, meeting = infinity, None
+    while queues[0] and queues[1]:
+        if queues[0][0][0] + queues[1][0][0] >= best:
+            break
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        _, vertex = heappop(queues[side])
+        if stats is not None:
+            stats.pop(len(queues[0]) + len(queues[1]))
+        if settled[side][vertex]:
+            continue
+        settled[side][vertex] = 1
+
+        own, other = distances[side], distances[1 - side]
+        parent, queue, sign, touch = parents[side], queues[side], signs[side], touches[side]
+        graph = graphs[side]
+        lo, hi = graph.offsets[vertex], graph.offsets[vertex + 1]
+        for neighbor, weight in zip(graph.targets[lo:hi], graph.weights[lo:hi]):
+            if potential is not None and potential[neighbor] is None:
+                continue
+            new_distance = own[vertex] + weight
+            if new_distance < own[neighbor]:
+                own[neighbor] = new_distance
+                parent[neighbor] = vertex
+                touch(neighbor)
+                key = new_distance if potential is None else new_distance + sign * potential[neighbor]
+                heappush(queue, (key, neighbor))
+            if own[neighbor] + other[neighbor] < best:
+                best = own[neighbor] + other[neighbor]
+                meeting = neighbor
+        if stats is not None:
+            stats.expand(hi - lo, len(queues[0]) + len(queues[1]))
+
+    if meeting is None:
+        return [], infinity
+    path = _reconstruct_path(parents[0], start, meeting)
+    vertex = meeting
+    while vertex != goal:
+        vertex = parents[1][vertex]
+        path.append(vertex)
+    return path, best
+
+def bidirectional_dijkstra(graph, start, goal, stats=None):
+    """
+    Dijkstra run from start and from goal at the same time; for directed
+    graphs the backward search walks the reversed edges.
+
+    param graph: dict or CSRGraph, A dictionary where keys are tuple of nodes and values 
+
+    param start: The starting node
+
+    param goal: The goal node
+
+    param stats: optional instrumentation.SearchStats to count the work into
+
+    returns shortest path, which is presented in a
+    tuple (path: list of nodes, weight)
+
+    >>> graph = {'A': [('B', 1), ('C', 4)], 'B': [('C', 1), ('D', 5)], 'C': [('D', 1)], 'D': []}
+    >>> bidirectional_dijkstra(graph, 'A', 'D')
+    (['A', 'B', 'C', 'D'], 3)
+    """
+    csr = as_csr(graph)
+    if start not in csr.index or goal not in csr.index:
+        return [], float('infinity')
+    start, goal = csr.index[start], csr.index[goal]
+    if start == goal:
+        return csr.path_labels([start]), 0
+
+    reverse_graph = csr.reverse()
+    with csr.search_state() as forward, reverse_graph.search_state() as backward:
+        path, distance = _bidirectional_search(csr, reverse_graph, start, goal,
+                                               (forward, backward), stats=stats)
+    return csr.path_labels(path), distance
+
+def bidirectional_astar(graph, start, goal, stats=None):
+    """
+    Bidirectional A* with the average potential
+    p(v) = (h_goal(v) - h_start(v)) / 2, where h_goal and h_start are the
+    hop-count lower bounds used by astar towards goal and towards start.
+    With this potential both searches see the same non-negative reduced
+    edge weights, so the bidirectional Dijkstra stopping rule stays exact.
+
+    param graph: dict or CSRGraph, A dictionary where keys are tuple of nodes and values 
+
+    param start: The starting node
+
+    param goal: The goal node
+
+    param stats: optional instrumentation.SearchStats to count the work into
+
+    returns shortest path, which is presented in a
+    tuple (path: list of nodes, weight)
+
+    >>> graph = {'A': [('B', 1), ('C', 4)], 'B': [('C', 1), ('D', 5)], 'C': [('D', 1)], 'D': []}
+    >>> bidirectional_astar(graph, 'A', 'D')
+    (['A', 'B', 'C', 'D'], 3)
+    """
+    csr = as_csr(graph)
+    if start not in csr.index or goal not in csr.index:
+        return [], float('infinity')
+    start, goal = csr.index[start], csr.index[goal]
+    if start == goal:
+        return csr.path_labels([start]), 0
+
+    reverse_graph = csr.reverse()
+    min_edge_weight = csr.min_weight()
+    to_goal = _min_steps_heuristic(reverse_graph, goal, min_edge_weight)
+    to_start = _min_steps_heuristic(csr, start, min_edge_weight)
+    potential = [(h_goal - h_start) / 2
+                 if h_goal != float('infinity') and h_start != float('infinity') else None
+                 for h_goal, h_start in zip(to_goal, to_start)]
+    if potential[start] is None:
+        return [], float('infinity')
+
+    with csr.search_state() as forward, reverse_graph.search_state() as backward:
+        path, distance = _bidirectional_search(csr, reverse_graph, start, goal,
+                                               (forward, backward), potential, stats)
+    return csr.path_labels(path), distance
+
+
+def _bellman_ford_search(csr, start, stats=None):
+    """
+    Bellman-Ford over node ids of a CSRGraph, stopping after the first
+    pass that changes nothing. Returns the distance and predecessor lists;
+    raises NegativeCycleError if a negative cycle is reachable from start.
+
+    stats is an optional instrumentation.SearchStats; every pass expands
+    all vertices and relaxes all edges.
+    """
+    distance = [float('inf')] * len(csr)
+    predecessor = [None] * len(csr)
+    distance[start] = 0
+
+    for _ in range(len(csr) - 1):
+        if stats is not None:
+            stats.expanded += len(csr)
+            stats.relaxed += csr.num_edges
+        changed = False
+        for vertex, neighbor, weight in csr.edges():
+            if distance[vertex] + weight < distance[neighbor]:
+                distance[neighbor] = distance[vertex] + weight
+                predecessor[neighbor] = vertex
+                changed = True
+        if not changed:
+            break
+    else:
+        for vertex, neighbor, weight in csr.edges():
+            if distance[vertex] + weight < distance[neighbor]:
+                predecessor[neighbor] = vertex
+                raise NegativeCycleError(csr.path_labels(_predecessor_cycle(predecessor, neighbor)))
+    return distance, predecessor
+
+
+def bellman_ford(graph, start, goal, stats=None):
     """
-    param graph: dict, A dictionary where keys are tuple of nodes and values 
+    param graph: dict or CSRGraph, A dictionary where keys are tuple of nodes and values 
     
     param start: The starting node
     
@@ -265,125 +835,175 @@ def bellman_ford(graph, start, goal):
     >>> bellman_ford(graph, 'A', 'D')
     (['A', 'B', 'C', 'D'], 3)
     """
-    distance = {vertex: float('inf') for vertex in graph}
-    predecessor = {}
-    distance[start] = 0
+    csr = as_csr(graph)
+    if start not in csr.index or goal not in csr.index:
+        return [], float('inf')
+    start, goal = csr.index[start], csr.index[goal]
 
-    for _ in range(len(graph) - 1):
-        for vertex in graph:
-            for neighbor, weight in graph.get(vertex, []):
-                if neighbor in distance and distance[vertex] + weight < distance[neighbor]:
-                    distance[neighbor] = distance[vertex] + weight
-                    predecessor[neighbor] = vertex
+    distance, predecessor = _bellman_ford_search(csr, start, stats)
 
     path = []
     current_vertex = goal
     while current_vertex != start:
         path.append(current_vertex)
-        current_vertex = predecessor.get(current_vertex)
+        current_vertex = predecessor[current_vertex]
         if current_vertex is None:
             return [], float('inf')
     path.append(start)
     path.reverse()
 
-    return path, distance[goal]
+    return csr.path_labels(path), distance[goal]
 
 
-def floyd_warshall(graph, start, end):
+def floyd_warshall(graph, start, end, block_size=None, stats=None):
     """
     Implements the Floyd-Warshall algorithm
 
-    param graph: dict, A dictionary where keys are tuple of nodes and values 
+    param graph: dict or CSRGraph, A dictionary where keys are tuple of nodes and values 
     
     param start: The starting node
     
     param end: The goal node
 
+    param block_size: tile size for the blocked variant, see
+    all_pairs.floyd_warshall_matrix
+
+    param stats: optional instrumentation.SearchStats; every intermediate
+    vertex counts as expanded and every (i, j, k) update as a relaxation
+
     returns shortest path, which is presented in a uple (path: list of nodes, weight)
+
+    All pairs are computed anyway; use all_pairs.floyd_warshall_matrix
+    directly to keep them for further queries.
+
+    >>> graph = {'A': [('B', 1)], 'B': [('C', 1)], 'C': [('A', 1), ('D', 1)], 'D': []}
+    >>> floyd_warshall(graph, 'A', 'D')
+    (['A', 'B', 'C', 'D'], 3)
     """
-    if start not in graph or end not in graph:
+    csr = as_csr(graph)
+    if start not in csr.index or end not in csr.index:
         return [], float('inf')
+    if stats is not None:
+        stats.expanded += len(csr)
+        stats.relaxed += len(csr) ** 3
+    return floyd_warshall_matrix(csr, block_size).path(start, end)
+
+
 
-    nodes = graph.keys()
-    dist = {u: {v: float('inf') for v in nodes} for u in nodes}
-    next_node = {u: {v: None for v in nodes} for u in nodes}
+def _spfa_search(csr, start, slf=False, lll=False, stats=None):
+    """
+    SPFA over node ids of a CSRGraph: a FIFO queue of vertices whose
+    distance dropped, with a bitmap for O(1) queue membership.
 
-    for u in graph:
-        for v, weight in graph[u]:
-            dist[u][v] = weight
-            next_node[u][v] = v
-        dist[u][u] = 0
+    slf (Small Label First) puts a vertex at the front of the queue when
+    its distance is below that of the current front. lll (Large Label
+    Last) moves front vertices whose distance is above the queue average
+    to the back before popping.
 
-    for k in nodes:
-        for i in nodes:
-            for j in nodes:
-                if dist[i][j] > dist[i][k] + dist[k][j]:
-                    dist[i][j] = dist[i][k] + dist[k][j]
-                    next_node[i][j] = next_node[i][k]
+    length[v] counts the edges of the current path to v; a path with n
+    edges repeats a vertex, which means a negative cycle.
 
-    def reconstruct_path(start, end):
-        if next_node[start][end] is None:
-            return []
-        path = [start]
-        while start != end:
-            start = next_node[start][end]
-            path.append(start)
-        return path
+    stats is an optional instrumentation.SearchStats.
 
-    shortest_path = reconstruct_path(start, end)
-    return shortest_path, dist[start][end] if shortest_path else float('inf')
+    Returns the distance and predecessor lists.
+    """
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    n = len(csr)
+    distances = [float('inf')] * n
+    previous = [None] * n
+    length = [0] * n
+    in_queue = bytearray(n)
+    distances[start] = 0
 
+    queue = deque([start])
+    in_queue[start] = 1
+    queued_total = 0
+    if stats is not None:
+        stats.pushes += 1
 
+    while queue:
+        if lll:
+            for _ in range(len(queue)):
+                if distances[queue[0]] * len(queue) <= queued_total:
+                    break
+                queue.append(queue.popleft())
+        vertex = queue.popleft()
+        if stats is not None:
+            stats.pop(len(queue))
+        in_queue[vertex] = 0
+        distance = distances[vertex]
+        queued_total -= distance
+
+        lo, hi = offsets[vertex], offsets[vertex + 1]
+        for neighbor, weight in zip(targets[lo:hi], weights[lo:hi]):
+            new_distance = distance + weight
+            if new_distance < distances[neighbor]:
+                if in_queue[neighbor]:
+                    queued_total += new_distance - distances[neighbor]
+                distances[neighbor] = new_distance
+                previous[neighbor] = vertex
+                length[neighbor] = length[vertex] + 1
+                if length[neighbor] >= n:
+                    raise NegativeCycleError(csr.path_labels(_predecessor_cycle(previous, neighbor)))
+
+                if not in_queue[neighbor]:
+                    in_queue[neighbor] = 1
+                    queued_total += new_distance
+                    if slf and queue and new_distance < distances[queue[0]]:
+                        queue.appendleft(neighbor)
+                    else:
+                        queue.append(neighbor)
+        if stats is not None:
+            stats.expand(hi - lo, len(queue))
 
-def spfa(graph, start, end):
+    return distances, previous
+
+def spfa(graph, start, end, slf=False, lll=False, stats=None):
     """
     Implements the  Shortest Path Faster Algorithm (SPFA)
 
-    param graph: dict, A dictionary where keys are tuple of nodes and values 
+    param graph: dict or CSRGraph, A dictionary where keys are tuple of nodes and values 
     
     param start: The starting node
     
     param end: The goal node
 
-    returns shortest path, which is presented in a uple (path: list of nodes, weight)
+    param slf: use the Small Label First queue order
+
+    param lll: use the Large Label Last queue order
+
+    param stats: optional instrumentation.SearchStats to count the work into
+
+    returns shortest path, which is presented in a uple (path: list of nodes, weight);
+    raises NegativeCycleError if a negative cycle is reachable from start
 
     >>> graph = {'A': [('B', 1)], 'B': [('C', 1)], 'C': [('A', 1), ('D', 1)], 'D': []}
     >>> spfa(graph, 'A', 'D')
     (['A', 'B', 'C', 'D'], 3)
+    >>> spfa(graph, 'A', 'D', slf=True, lll=True)
+    (['A', 'B', 'C', 'D'], 3)
     """
+    csr = as_csr(graph)
+    if start not in csr.index or end not in csr.index:
+        return [], float('inf')
+    start, end = csr.index[start], csr.index[end]
 
-    distances = {node: float('inf') for node in graph}
-    distances[start] = 0
-
-    queue = [start]
-
-    prev_nodes = {node: None for node in graph}
-
-    while queue:
-        current_node = queue.pop()
-
-        for neighbor, weight in graph.get(current_node, []):
-            if neighbor in distances:
-                new_weight = distances[current_node] + weight
-                old_weight = distances[neighbor]
-
-                if new_weight < old_weight:
-                    distances[neighbor] = new_weight
-                    prev_nodes[neighbor] = current_node
-
-                    if neighbor not in queue:
-                        queue.append(neighbor)
-
-    path = []
-    current_node = end
-
+    distances, prev_nodes = _spfa_search(csr, start, slf, lll, stats)
     if distances[end] == float('inf'):
         return [], float('inf')
 
-    while current_node is not None:
-        path.append(current_node)
-        current_node = prev_nodes[current_node]
-
-    path.reverse()
-
-    return path, distances[end]
+    return csr.path_labels(_reconstruct_path(prev_nodes, start, end)), distances[end]
+
+
+# Point-to-point algorithms by name, for the batch runner and benchmarks.
+ALGORITHMS = {
+    'bfs': bfs,
+    'dfs': dfs,
+    'dijkstra': dijkstra,
+    'astar': astar,
+    'bidirectional_dijkstra': bidirectional_dijkstra,
+    'bidirectional_astar': bidirectional_astar,
+    'bellman_ford': bellman_ford,
+    'floyd_warshall': floyd_warshall,
+    'spfa': spfa,
+}
@@ -0,0 +1,133 @@
+"""
+All-pairs shortest paths kept as dense NumPy matrices.
+"""
+
+import numpy as np
+
+from csr_graph import as_csr
+
+
+class AllPairs:
+    """
+    Distance and next-hop matrices over the node ids of one graph.
+    next_hop[i, j] is the vertex after i on a shortest i -> j path,
+    or -1 when j is unreachable from i.
+
+    >>> pairs = floyd_warshall_matrix({'a': [('b', 1)], 'b': [('c', 2)], 'c': []})
+    >>> pairs.path('a', 'c'), pairs.path('c', 'a')
+    ((['a', 'b', 'c'], 3), ([], inf))
+    """
+
+    def __init__(self, labels, dist, next_hop, integral=False):
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.dist = dist
+        self.next_hop = next_hop
+        self.integral = integral
+
+    def _weight(self, i, j):
+        weight = self.dist[i, j].item()
+        if self.integral and weight != float('inf'):
+            return int(weight)
+        return weight
+
+    def distance(self, start, end):
+        """
+        Shortest distance from start to end (labels).
+        """
+        if start not in self.index or end not in self.index:
+            return float('inf')
+        return self._weight(self.index[start], self.index[end])
+
+    def path(self, start, end):
+        """
+        Shortest path from start to end in O(path length), returned as a
+        tuple (path: list of nodes, weight).
+        """
+        if start not in self.index or end not in self.index:
+            return [], float('inf')
+        i, j = self.index[start], self.index[end]
+        if self.next_hop[i, j] < 0:
+            return [], float('inf')
+        path = [i]
+        while path[-1] != j:
+            path.append(int(self.next_hop[path[-1], j]))
+        return [self.labels[vertex] for vertex in path], self._weight(i, j)
+
+
+def _edge_arrays(csr):
+    """
+    Source, target and weight arrays of all edges of a CSRGraph.
+    """
+    degrees = np.diff(np.asarray(csr.offsets, dtype=np.int64))
+    sources = np.repeat(np.arange(len(csr), dtype=np.int64), degrees)
+    targets = np.asarray(csr.targets, dtype=np.int64)
+    weights = np.asarray(csr.weights, dtype=np.float64)
+    return sources, targets, weights
+
+
+def _initial_matrices(csr):
+    n = len(csr)
+    dist = np.full((n, n), np.inf)
+    next_hop = np.full((n, n), -1, dtype=np.int32 if n < 2 ** 31 else np.int64)
+    sources, targets, weights = _edge_arrays(csr)
+    np.minimum.at(dist, (sources, targets), weights)
+    next_hop[sources, targets] = targets
+    diagonal = np.arange(n)
+    dist[diagonal, diagonal] = 0
+    next_hop[diagonal, diagonal] = diagonal
+    return dist, next_hop
+
+
+def _relax(dist, next_hop, rows, cols, ks):
+    """
+    Floyd-Warshall updates of the tile dist[rows, cols] through every
+    intermediate vertex k in ks, one k-row at a time.
+    """
+    tile = dist[rows, cols]
+    tile_next = next_hop[rows, cols]
+    via = np.empty_like(tile)
+    better = np.empty(tile.shape, dtype=bool)
+    for k in range(ks.start, ks.stop):
+        np.add(dist[rows, k, None], dist[None, k, cols], out=via)
+        np.less(via, tile, out=better)
+        if better.any():
+            np.copyto(tile, via, where=better)
+            np.copyto(tile_next, next_hop[rows, k, None], where=better)
+
+
+def floyd_warshall_matrix(graph, block_size=None):
+    """
+    Floyd-Warshall on dense NumPy matrices.
+
+    param graph: dict or CSRGraph
+
+    param block_size: None relaxes whole matrices per k; an integer
+    switches to the blocked (tiled) variant, where each pass only touches
+    block_size x block_size tiles so they stay in cache on large graphs
+
+    returns AllPairs
+    """
+    csr = as_csr(graph)
+    n = len(csr)
+    dist, next_hop = _initial_matrices(csr)
+    whole = slice(0, n)
+
+    if block_size is None or block_size >= n:
+        _relax(dist, next_hop, whole, whole, whole)
+    else:
+        blocks = [slice(lo, min(lo + block_size, n)) for lo in range(0, n, block_size)]
+        for k_block in blocks:
+            _relax(dist, next_hop, k_block, k_block, k_block)
+            for block in blocks:
+                if block is not k_block:
+                    _relax(dist, next_hop, k_block, block, k_block)
+                    _relax(dist, next_hop, block, k_block, k_block)
+            for row_block in blocks:
+                if row_block is k_block:
+                    continue
+                for col_block in blocks:
+                    if col_block is not k_block:
+                        _relax(dist, next_hop, row_block, col_block, k_block)
+
+    return AllPairs(csr.labels, dist, next_hop, integral=csr.weight_typecode == 'q')
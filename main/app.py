@@ -1,10 +1,14 @@
 'графічний інтерфейс'
 
 import tkinter as tk
+from functools import partial
 from tkinter import filedialog, messagebox, ttk
-from algorithms import bfs, dfs, dijkstra, astar, bellman_ford, floyd_warshall, spfa
-from graph_utils import read_graph_from_file, build_graph, graph_to_edge_list
-from timing import time_algorithm
+from algorithms import bfs, dfs, dijkstra, astar, bellman_ford, floyd_warshall, spfa,\
+    bidirectional_dijkstra, bidirectional_astar
+from binary_graph import load_graph_cached
+from graph_utils import GRID_SUFFIX, build_graph, graph_to_edge_list
+from grid import jump_point_search
+from background import AlgorithmRunner
 from visualization import visualize_graph
 import generate_graph
 import matplotlib.pyplot as plt
@@ -44,12 +48,22 @@ def create_widgets(root):
     widgets['directed_check'].grid(row=3, column=0, columnspan=2, pady=10)
 
 
+    ttk.Label(frame, text="Ліміт часу на алгоритм (с):", font=("Arial", 12),\
+              background="#d5f0f9").grid(row=4, column=0, sticky="w", pady=5)
+    widgets['timeout_entry'] = ttk.Entry(frame, width=20)
+    widgets['timeout_entry'].insert(0, "30")
+    widgets['timeout_entry'].grid(row=4, column=1, pady=5)
+
     widgets['run_button'] = ttk.Button(frame, text="Запустити алгоритми", style="Custom.TButton")
-    widgets['run_button'].grid(row=4, column=0, columnspan=2, pady=5)
+    widgets['run_button'].grid(row=5, column=0, pady=5)
+
+    widgets['cancel_button'] = ttk.Button(frame, text="Скасувати", style="Custom.TButton",\
+                                          state=tk.DISABLED)
+    widgets['cancel_button'].grid(row=5, column=1, pady=5)
 
     widgets['visualize_button'] = ttk.Button(frame, text="Візуалізувати граф",\
                                                     style="Custom.TButton")
-    widgets['visualize_button'].grid(row=5, column=0, columnspan=2, pady=5)
+    widgets['visualize_button'].grid(row=6, column=0, columnspan=2, pady=5)
 
     widgets['output_text'] = tk.Text(root, width=90, height=30)
     widgets['output_text'].pack(pady=15)
@@ -62,12 +76,13 @@ def load_graph(state, widgets):
     """
     filename = filedialog.askopenfilename(title="Виберіть файл з графом")
     if filename:
-        edge_list = read_graph_from_file(filename)
-        if not edge_list:
+        graph = load_graph_cached(filename, state.get('directed', False))
+        if not graph:
             messagebox.showerror("Помилка", "Не вдалося завантажити граф. Перевірте файл")
         else:
-            state['edge_list'] = edge_list
-            state['graph'] = build_graph(edge_list, state.get('directed', False))
+            state['filename'] = filename
+            state['edge_list'] = None
+            state['graph'] = graph
             messagebox.showinfo("Успіх!", "Граф успішно завантажено")
 
 def random_graph(state, widgets):
@@ -76,6 +91,7 @@ def random_graph(state, widgets):
     """
     graph = generate_graph.generate_random_graph()
     state['graph'] = graph
+    state['filename'] = None
     state['edge_list'] = graph_to_edge_list(graph, state.get('directed', False))
     messagebox.showinfo("Успіх!", "Граф успішно згенеровано")
     widgets['output_text'].delete(1.0, tk.END)
@@ -84,14 +100,18 @@ def random_graph(state, widgets):
 
 def run_algorithms(state, widgets):
     """
-    Виконує алгоритми пошуку шляху та виводить результати.
+    Запускає алгоритми пошуку шляху у фонових процесах; результати
+    виводить poll_algorithms у міру їх готовності.
     """
     if not state.get('graph'):
         messagebox.showwarning("Попередження", "Спочатку завантажте граф.")
         return None
 
     state['directed'] = widgets['directed_var'].get()
-    state['graph'] = build_graph(state['edge_list'], state['directed'])
+    if state.get('filename'):
+        state['graph'] = load_graph_cached(state['filename'], state['directed'])
+    else:
+        state['graph'] = build_graph(state['edge_list'], state['directed'], compact=True)
 
     start = widgets['start_entry'].get()
     goal = widgets['goal_entry'].get()
@@ -104,36 +124,103 @@ def run_algorithms(state, widgets):
         messagebox.showerror("Помилка", "Стартова або цільова вершина відсутня у графі.")
         return None
 
+    try:
+        timeout = float(widgets['timeout_entry'].get())
+    except ValueError:
+        messagebox.showerror("Помилка", "Ліміт часу має бути числом секунд.")
+        return None
+
     algorithms = [
         ('BFS', bfs),
         ('DFS', dfs),
         ('Dijkstra', dijkstra),
+        ('Bidirectional Dijkstra', bidirectional_dijkstra),
         ('A*', astar),
+        ('Bidirectional A*', bidirectional_astar),
         ('Bellman-Ford', bellman_ford),
         ('Floyd-Warshall', floyd_warshall),
         ('SPFA', spfa)
     ]
+    if (state.get('filename') or '').endswith(GRID_SUFFIX):
+        algorithms += [
+            ('A* (octile)', partial(astar, heuristic='octile')),
+            ('Jump Point Search', jump_point_search)
+        ]
 
     widgets['output_text'].delete(1.0, tk.END)
     state['times'] = {}
     state['paths'] = {}
 
+    if state.get('filename'):
+        spec = ('file', state['filename'], state['directed'])
+    else:
+        spec = ('edge_list', state['edge_list'], state['directed'])
+    state['runner'] = AlgorithmRunner(spec, algorithms, start, goal, timeout)
+    widgets['run_button'].config(state=tk.DISABLED)
+    widgets['cancel_button'].config(state=tk.NORMAL)
+    poll_algorithms(state, widgets)
 
-    for name, algorithm in algorithms:
-        result = time_algorithm(algorithm, state['graph'], start, goal)
-
-        if result[0]:
-            path, total_weight, exec_time = result
-            state['times'][name] = exec_time
-            state['paths'][name] = path
-            widgets['output_text'].insert(tk.END,\
-                    f"Знайдений шлях ({name}): {path} з сумарною вагою {total_weight}\n")
-            widgets['output_text'].insert(tk.END, f"Час виконання: {exec_time:.7f} секунд\n\n")
-        else:
-            widgets['output_text'].insert(tk.END, f"Шлях не знайдено ({name}).\n\n")
-            state['times'][name] = None
-            state['paths'][name] = None
+def show_result(state, widgets, event):
+    """
+    Виводить результат одного алгоритму.
+    """
+    name, kind = event[:2]
+    output = widgets['output_text']
+    state['times'][name] = None
+    state['paths'][name] = None
+    if kind == 'done':
+        path, total_weight, exec_time, stats = event[2:]
+        state['times'][name] = exec_time
+        state['paths'][name] = path
+        output.insert(tk.END, f"Знайдений шлях ({name}): {path} з сумарною вагою {total_weight}\n")
+        output.insert(tk.END, f"Час виконання: {exec_time:.7f} секунд\n")
+        output.insert(tk.END,
+            f"Розкрито вершин: {stats['expanded']}, перевірено ребер: {stats['relaxed']}, "
+            f"вставок у чергу: {stats['pushes']}, вилучень: {stats['pops']}, "
+            f"найбільша черга: {stats['peak_frontier']}, "
+            f"пікова пам'ять: {stats['peak_memory'] / 1024:.1f} КБ\n\n")
+    elif kind == 'not_found':
+        output.insert(tk.END, f"Шлях не знайдено ({name}).\n\n")
+    elif kind == 'error':
+        output.insert(tk.END, f"{name}: {event[2]}\n\n")
+    elif kind == 'timeout':
+        output.insert(tk.END, f"{name}: перевищено ліміт часу, виконання зупинено.\n\n")
+    else:
+        output.insert(tk.END, f"{name}: скасовано.\n\n")
+    output.see(tk.END)
+
+def poll_algorithms(state, widgets):
+    """
+    Забирає готові результати фонового виконання; викликається через root.after.
+    """
+    runner = state.get('runner')
+    if runner is None:
+        return
+    for event in runner.poll():
+        show_result(state, widgets, event)
+    if runner.done:
+        finish_run(state, widgets)
+    else:
+        widgets['output_text'].after(100, poll_algorithms, state, widgets)
+
+def cancel_algorithms(state, widgets):
+    """
+    Зупиняє поточний алгоритм і скасовує решту.
+    """
+    runner = state.get('runner')
+    if runner is None:
+        return
+    for event in runner.cancel():
+        show_result(state, widgets, event)
+    finish_run(state, widgets)
 
+def finish_run(state, widgets):
+    """
+    Повертає кнопки у вихідний стан і будує графік часу.
+    """
+    state['runner'] = None
+    widgets['run_button'].config(state=tk.NORMAL)
+    widgets['cancel_button'].config(state=tk.DISABLED)
     plot_times(state['times'])
 
 def visualize(state):
@@ -0,0 +1,134 @@
+"""
+Run algorithms in worker processes so the GUI stays responsive.
+
+Each algorithm gets its own process, one after another, so timings are
+not disturbed by each other. A process that exceeds its time budget or is
+cancelled is terminated; Python threads could not be stopped that way.
+"""
+
+import multiprocessing
+import time
+
+from binary_graph import load_graph_cached
+from graph_utils import build_graph
+from instrumentation import profile_algorithm
+from timing import time_algorithm
+
+
+def load_graph_spec(spec):
+    """
+    Build the graph described by spec: ('file', filename, directed) reopens
+    the cached binary copy, ('edge_list', edge_list, directed) builds a CSRGraph.
+    """
+    kind, source, directed = spec
+    if kind == 'file':
+        return load_graph_cached(source, directed)
+    return build_graph(source, directed, compact=True)
+
+
+def _worker(connection, spec, algorithm, start, goal):
+    graph = load_graph_spec(spec)
+    try:
+        result = time_algorithm(algorithm, graph, start, goal)
+        if result and result[0]:
+            _, stats = profile_algorithm(algorithm, graph, start, goal)
+            connection.send(('done',) + tuple(result) + (stats.as_dict(),))
+        else:
+            connection.send(('not_found',))
+    except Exception as error:  # reported to the GUI instead of lost with the process
+        connection.send(('error', str(error)))
+    finally:
+        connection.close()
+
+
+class AlgorithmRunner:
+    """
+    Runs (name, function) pairs one at a time, each in a fresh process with
+    a time budget. Call poll() periodically (e.g. from root.after); it
+    never blocks and returns the events that happened since the last call:
+
+        (name, 'done', path, weight, seconds, stats dict)
+        (name, 'not_found')
+        (name, 'error', message)
+        (name, 'timeout')
+        (name, 'cancelled')
+
+    >>> from algorithms import dijkstra
+    >>> runner = AlgorithmRunner(('edge_list', [('a', 'b', 1), ('b', 'c', 2)], False),
+    ...                          [('Dijkstra', dijkstra)], 'a', 'c', timeout=60)
+    >>> events = []
+    >>> while not runner.done:
+    ...     events += runner.poll()
+    ...     time.sleep(0.05)
+    >>> events[0][:4]
+    ('Dijkstra', 'done', ['a', 'b', 'c'], 3)
+    """
+
+    def __init__(self, spec, algorithms, start, goal, timeout=30.0):
+        self.spec = spec
+        self.pending = list(algorithms)
+        self.start = start
+        self.goal = goal
+        self.timeout = timeout
+        # Forking a process that runs Tk is unsafe on some platforms.
+        self.context = multiprocessing.get_context('spawn')
+        self.current = None
+        self.done = False
+
+    def _launch(self):
+        name, algorithm = self.pending.pop(0)
+        receiver, sender = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=_worker, daemon=True,
+                                       args=(sender, self.spec, algorithm, self.start, self.goal))
+        process.start()
+        sender.close()
+        self.current = (name, process, receiver, time.monotonic() + self.timeout)
+
+    def _stop_current(self):
+        _, process, receiver, _ = self.current
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        receiver.close()
+        self.current = None
+
+    def poll(self):
+        """
+        Collect finished results and start the next algorithm; returns
+        the new events.
+        """
+        events = []
+        while not self.done:
+            if self.current is None:
+                if not self.pending:
+                    self.done = True
+                    break
+                self._launch()
+            name, process, receiver, deadline = self.current
+            if receiver.poll():
+                try:
+                    events.append((name,) + receiver.recv())
+                except EOFError:
+                    events.append((name, 'error', f"exit code {process.exitcode}"))
+            elif not process.is_alive():
+                events.append((name, 'error', f"exit code {process.exitcode}"))
+            elif time.monotonic() > deadline:
+                events.append((name, 'timeout'))
+            else:
+                break
+            self._stop_current()
+        return events
+
+    def cancel(self):
+        """
+        Stop the running algorithm and drop the ones not started yet.
+        Returns their 'cancelled' events.
+        """
+        events = []
+        if self.current is not None:
+            events.append((self.current[0], 'cancelled'))
+            self._stop_current()
+        events.extend((name, 'cancelled') for name, _ in self.pending)
+        self.pending = []
+        self.done = True
+        return events
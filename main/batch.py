@@ -0,0 +1,129 @@
+"""
+Batch shortest path queries spread over a process pool.
+
+The graph is converted to CSR form once and its offsets, targets and
+weights arrays are copied into one shared memory block. Workers attach to
+that block when they start, so a task only carries its query pairs, never
+the graph.
+"""
+
+import os
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from multiprocessing import shared_memory
+
+from algorithms import ALGORITHMS
+from csr_graph import CSRGraph, as_csr
+
+# Per-worker state, set by _attach.
+_shared = None
+_graph = None
+_search = None
+
+
+def _share(csr):
+    """
+    Copy the CSR arrays of csr into a new shared memory block.
+    Returns the block and the layout workers need to rebuild the graph.
+    """
+    parts = [array('q', csr.offsets), array('i', csr.targets),
+             array(csr.weight_typecode, csr.weights)]
+    sizes = [len(part) * part.itemsize for part in parts]
+    # Keep every section 8-byte aligned so the casts below are valid.
+    starts = [0]
+    for size in sizes:
+        starts.append(starts[-1] + size + (-size % 8))
+    block = shared_memory.SharedMemory(create=True, size=max(starts[-1], 1))
+    for part, start, size in zip(parts, starts, sizes):
+        block.buf[start:start + size] = part.tobytes()
+    layout = [(part.typecode, start, size) for part, start, size in zip(parts, starts, sizes)]
+    return block, layout
+
+
+def _open_shared(name):
+    try:
+        # Python 3.13+: the parent owns the block, do not track it here.
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _attach(name, layout, labels, directed, algorithm, options):
+    """
+    Worker initializer: map the shared arrays into a CSRGraph.
+    """
+    global _shared, _graph, _search
+    _shared = _open_shared(name)
+    offsets, targets, weights = (_shared.buf[start:start + size].cast(typecode)
+                                 for typecode, start, size in layout)
+    _graph = CSRGraph(labels, offsets, targets, weights, directed)
+    function = ALGORITHMS[algorithm]
+    _search = lambda start, goal: function(_graph, start, goal, **options)
+
+
+def _run_chunk(queries):
+    return [(start, goal) + tuple(_search(start, goal)) for start, goal in queries]
+
+
+def run_batch(graph, queries, algorithm='dijkstra', workers=None, chunk_size=64,
+              ordered=True, **options):
+    """
+    Answer many (start, goal) queries on one graph in parallel.
+
+    param graph: dict or CSRGraph
+
+    param queries: iterable of (start, goal) pairs; it is consumed lazily,
+    so a generator of any length works
+
+    param algorithm: a key of ALGORITHMS
+
+    param workers: number of processes, os.cpu_count() by default
+
+    param chunk_size: queries sent to a worker per task
+
+    param ordered: yield results in query order; with False they are
+    yielded as soon as their chunk completes
+
+    options are passed on to the algorithm, e.g. heap='dary' for dijkstra.
+
+    yields (start, goal, path, weight) tuples; an exception raised by the
+    algorithm (e.g. NegativeCycleError) is re-raised here
+
+    >>> graph = {'a': [('b', 1)], 'b': [('c', 2)], 'c': []}
+    >>> list(run_batch(graph, [('a', 'c'), ('c', 'a')], workers=2))
+    [('a', 'c', ['a', 'b', 'c'], 3), ('c', 'a', [], inf)]
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm {algorithm!r}, expected one of {list(ALGORITHMS)}")
+    workers = workers or os.cpu_count() or 1
+    csr = as_csr(graph)
+    block, layout = _share(csr)
+    queries = iter(queries)
+    try:
+        with ProcessPoolExecutor(workers, initializer=_attach,
+                                 initargs=(block.name, layout, csr.labels, csr.directed,
+                                           algorithm, options)) as pool:
+            # A bounded window of chunks in flight keeps memory flat for
+            # long query streams while every worker stays busy.
+            pending = deque()
+            while True:
+                while len(pending) < 2 * workers:
+                    chunk = list(islice(queries, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(pool.submit(_run_chunk, chunk))
+                if not pending:
+                    break
+                if ordered:
+                    future = pending.popleft()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = done.pop()
+                    pending.remove(future)
+                yield from future.result()
+    finally:
+        block.close()
+        block.unlink()
+
@@ -0,0 +1,512 @@
+"""
+Benchmarks for the shortest path algorithms.
+
+Run from the main/ directory:
+
+    python benchmark.py heaps --sizes 500 1000 2000 4000
+    python benchmark.py suite --sizes 50 100 200 --degrees 4 8 --json new.json
+    python benchmark.py compare old.json new.json
+    python benchmark.py dynamic --sizes 200 1000 --updates 200
+    python benchmark.py pairs --sizes 250 500 1000
+    python benchmark.py delta --sizes 100000 --workers 1 2 4 8
+    python benchmark.py grid --sizes 100 300 --obstacles 0.2
+"""
+
+import argparse
+import csv
+from array import array
+from functools import partial
+import json
+import platform
+import random
+import sys
+import time
+
+from algorithms import ALGORITHMS, astar, dijkstra
+from all_pairs import floyd_warshall_matrix
+from csr_graph import CSRGraph
+from delta_stepping import DeltaStepping
+from dynamic import DynamicGraph
+from generate_graph import gnm_random_graph, grid_graph
+from graph_utils import build_graph
+from grid import jump_point_search
+from instrumentation import SearchStats, profile_algorithm
+from johnson import johnson_matrix
+from shortest_path_tree import single_source
+from timing import measure, summarize
+from vectorized import EdgeArray
+
+
+def _dijkstra_linear_scan(graph, start, goal):
+    """
+    The original O(V^2) dict-based Dijkstra, kept as the baseline the
+    heap-based versions are compared against.
+    """
+    distances = {vertex: float('infinity') for vertex in graph}
+    distances[start] = 0
+    previous_vertices = {vertex: None for vertex in graph}
+    unvisited = list(graph.keys())
+
+    while unvisited:
+        current_vertex = None
+        current_distance = float('infinity')
+        for vertex in unvisited:
+            if distances[vertex] < current_distance:
+                current_distance = distances[vertex]
+                current_vertex = vertex
+        if current_vertex is None or current_vertex == goal:
+            break
+        for neighbor, weight in graph[current_vertex]:
+            distance = distances[current_vertex] + weight
+            if distance < distances[neighbor]:
+                distances[neighbor] = distance
+                previous_vertices[neighbor] = current_vertex
+        unvisited.remove(current_vertex)
+
+    path = []
+    current = goal
+    while previous_vertices[current] is not None:
+        path.insert(0, current)
+        current = previous_vertices[current]
+    if distances[goal] != float('infinity'):
+        path.insert(0, current)
+    return path, distances[goal]
+
+
+def sparse_edge_list(num_vertices, average_degree=4, seed=0):
+    """
+    Connected random edge list: a random spanning path plus extra random
+    edges, weights from 1 to 10.
+    """
+    rng = random.Random(seed)
+    order = list(range(num_vertices))
+    rng.shuffle(order)
+    edges = [(order[i], order[i + 1], rng.randint(1, 10)) for i in range(num_vertices - 1)]
+    for _ in range(num_vertices * average_degree // 2 - len(edges)):
+        edges.append((rng.randrange(num_vertices), rng.randrange(num_vertices),
+                      rng.randint(1, 10)))
+    return edges
+
+
+def _best_time(function, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+
+def compare_dijkstra(sizes, repeat=3, seed=0):
+    """
+    Time the linear-scan Dijkstra against the heap-based variants on
+    random sparse graphs of the given sizes. Every query runs from vertex 0
+    to the vertex furthest from it in id order, and all variants must agree
+    on the distance.
+
+    Returns a list of rows {'vertices', 'edges', <variant>: seconds}.
+    """
+    rows = []
+    for size in sizes:
+        edge_list = sparse_edge_list(size, seed=seed)
+        graph = build_graph(edge_list)
+        csr = build_graph(edge_list, compact=True)
+        start, goal = 0, size - 1
+
+        variants = {
+            'linear': lambda: _dijkstra_linear_scan(graph, start, goal),
+            'binary': lambda: dijkstra(csr, start, goal, heap='binary'),
+            'dary': lambda: dijkstra(csr, start, goal, heap='dary'),
+            'pairing': lambda: dijkstra(csr, start, goal, heap='pairing'),
+            'dial': lambda: dijkstra(csr, start, goal, heap='dial'),
+            'radix': lambda: dijkstra(csr, start, goal, heap='radix'),
+        }
+        row = {'vertices': size, 'edges': csr.num_edges}
+        distances = set()
+        for name, function in variants.items():
+            row[name], (_, distance) = _best_time(function, repeat)
+            distances.add(distance)
+        if len(distances) != 1:
+            raise AssertionError(f"Dijkstra variants disagree on {size} vertices: {distances}")
+        rows.append(row)
+    return rows
+
+
+def run_suite(sizes, degrees, names=None, queries=5, warmup=1, repeat=5,
+              disable_gc=True, seed=0, stats=False):
+    """
+    Time every algorithm in names (all of ALGORITHMS by default) on
+    G(n, m) random graphs of every size and average degree.
+
+    Each sample answers the same `queries` random (start, goal) pairs, and
+    the statistics are per query. All algorithms must agree on the
+    distances.
+
+    With stats=True one more, untimed, run per query adds the average
+    SearchStats counters and tracemalloc peak memory of a query.
+
+    Returns a list of rows {'algorithm', 'vertices', 'degree', 'edges',
+    'queries', 'runs', 'min', 'median', 'mean', 'p90', 'p99', 'max', 'stdev'}.
+    """
+    names = list(names or ALGORITHMS)
+    rng = random.Random(seed)
+    rows = []
+    for size in sizes:
+        for degree in degrees:
+            csr = gnm_random_graph(size, size * degree // 2, seed)
+            pairs = [(rng.choice(csr.labels), rng.choice(csr.labels)) for _ in range(queries)]
+            distances = {}
+            for name in names:
+                function = ALGORITHMS[name]
+                times, results = measure(lambda: [function(csr, start, goal) for start, goal in pairs],
+                                         warmup, repeat, disable_gc)
+                distances[name] = [distance for _, distance in results]
+                row = {'algorithm': name, 'vertices': size, 'degree': degree,
+                       'edges': csr.num_edges, 'queries': queries}
+                row.update(summarize([sample / queries for sample in times]))
+                if stats:
+                    row.update(_average_stats(function, csr, pairs))
+                rows.append(row)
+            if len({tuple(found) for found in distances.values()}) > 1:
+                raise AssertionError(f"Algorithms disagree on {size} vertices: {distances}")
+    return rows
+
+
+def _average_stats(function, graph, pairs):
+    """
+    SearchStats counters and peak memory per query, averaged over pairs.
+    """
+    totals = dict.fromkeys(SearchStats.FIELDS, 0)
+    for start, goal in pairs:
+        _, stats = profile_algorithm(function, graph, start, goal)
+        for field, value in stats.as_dict().items():
+            totals[field] += value
+    return {field: total / len(pairs) for field, total in totals.items()}
+
+
+def compare_dynamic(sizes, degree=4, updates=100, all_pairs_limit=400, seed=0):
+    """
+    Time incremental repair of a shortest-path tree (and, up to
+    all_pairs_limit vertices, an all-pairs matrix) against recomputing
+    it from scratch after each of `updates` random weight changes.
+    A third of the changes lower a weight, a third raise one and the
+    rest delete an edge and insert it back. Both must agree at the end.
+
+    Returns rows {'structure', 'vertices', 'edges', 'updates',
+    'incremental', 'recompute', 'speedup'} with seconds per update.
+    """
+    rows = []
+    for size in sizes:
+        rng = random.Random(seed)
+        graph = DynamicGraph(gnm_random_graph(size, size * degree // 2, seed, max_weight=100))
+        edges = [(graph.labels[u], graph.labels[v])
+                 for u in range(len(graph)) for v in graph.out_edges[u] if u < v]
+        changes = []
+        for _ in range(updates):
+            a, b = rng.choice(edges)
+            weight = graph.out_edges[graph.index[a]][graph.index[b]]
+            kind = rng.randrange(3)
+            if kind == 0:
+                changes.append((graph.update_weight, a, b, max(1, weight // 2)))
+            elif kind == 1:
+                changes.append((graph.update_weight, a, b, weight * 2))
+            else:
+                changes.append((graph.delete_edge, a, b))
+                changes.append((graph.insert_edge, a, b, weight))
+
+        structures = [('tree', graph.shortest_path_tree, lambda: single_source(graph.to_csr(), 0))]
+        if size <= all_pairs_limit:
+            structures.append(('all_pairs', graph.all_pairs,
+                               lambda: floyd_warshall_matrix(graph.to_csr())))
+        for name, track, recompute in structures:
+            tracked = track(0) if name == 'tree' else track()
+            incremental = full = 0.0
+            for change, *args in changes:
+                start_time = time.perf_counter()
+                change(*args)
+                incremental += time.perf_counter() - start_time
+                start_time = time.perf_counter()
+                fresh = recompute()
+                full += time.perf_counter() - start_time
+            if name == 'tree':
+                agree = tracked.distances() == fresh.distances()
+            else:
+                agree = (tracked.dist == fresh.dist).all()
+            if not agree:
+                raise AssertionError(f"Incremental {name} differs from recomputation on {size} vertices")
+            graph.detach(tracked)
+            rows.append({'structure': name, 'vertices': size, 'edges': graph.to_csr().num_edges,
+                         'updates': len(changes), 'incremental': incremental / len(changes),
+                         'recompute': full / len(changes), 'speedup': full / incremental})
+    return rows
+
+
+def compare_all_pairs(sizes, degree=4, workers=None, floyd_limit=1000, seed=0):
+    """
+    Time Johnson's algorithm (in one process and with `workers`) against
+    Floyd-Warshall, up to floyd_limit vertices, on directed G(n, m)
+    graphs. Weights w + p(u) - p(v) with random potentials p make about
+    a tenth of the edges negative without creating negative cycles.
+
+    Returns rows {'vertices', 'edges', 'negative', 'johnson',
+    'johnson_parallel', 'floyd_warshall'} in seconds ('-' when skipped).
+    """
+    rows = []
+    for size in sizes:
+        csr = gnm_random_graph(size, size * degree, seed, directed=True, max_weight=20)
+        rng = random.Random(seed)
+        potential = [rng.randint(0, 20) for _ in range(size)]
+        weights = array('q', (weight + potential[u] - potential[v] for u, v, weight in csr.edges()))
+        graph = CSRGraph(csr.labels, csr.offsets, csr.targets, weights, directed=True)
+
+        row = {'vertices': size, 'edges': graph.num_edges,
+               'negative': sum(weight < 0 for weight in weights)}
+        row['johnson'], single = _best_time(lambda: johnson_matrix(graph, workers=1), 1)
+        row['johnson_parallel'], parallel = _best_time(lambda: johnson_matrix(graph, workers), 1)
+        results = [single.dist, parallel.dist]
+        row['floyd_warshall'] = '-'
+        if size <= floyd_limit:
+            row['floyd_warshall'], floyd = _best_time(lambda: floyd_warshall_matrix(graph), 1)
+            results.append(floyd.dist)
+        if any((result != results[0]).any() for result in results):
+            raise AssertionError(f"All-pairs results differ on {size} vertices")
+        rows.append(row)
+    return rows
+
+
+def delta_scaling(sizes, degree=8, workers=(1, 2, 4), deltas=(None,), repeat=3, seed=0):
+    """
+    Time delta-stepping from vertex 0 with every worker count and delta
+    on G(n, m) graphs, next to a single-core Dijkstra over the same graph.
+    All runs must agree on the distances.
+
+    Returns rows {'vertices', 'edges', 'delta', 'workers', 'seconds',
+    'speedup', 'vs_dijkstra'}; speedup is against the first worker count.
+    """
+    rows = []
+    for size in sizes:
+        csr = gnm_random_graph(size, size * degree // 2, seed)
+        edges = EdgeArray.from_graph(csr)
+        dijkstra_time, tree = _best_time(lambda: single_source(csr, 0), repeat)
+        expected = [float(distance) for distance in tree.dist]
+        for delta in deltas:
+            baseline = None
+            for count in workers:
+                search = DeltaStepping(edges, delta, count)
+                seconds, (distances, _) = _best_time(lambda: search.search(0), repeat)
+                if distances.tolist() != expected:
+                    raise AssertionError(f"Delta-stepping differs from Dijkstra on {size} vertices")
+                baseline = baseline or seconds
+                rows.append({'vertices': size, 'edges': csr.num_edges, 'delta': search.delta,
+                             'workers': count, 'seconds': seconds, 'speedup': baseline / seconds,
+                             'vs_dijkstra': dijkstra_time / seconds})
+    return rows
+
+
+def compare_grid(sizes, obstacle_ratio=0.2, queries=20, seed=0):
+    """
+    Dijkstra, A* with the default and the coordinate heuristics, and Jump
+    Point Search between random open cells of square 8-connected grid
+    maps. All of them must find paths of the same weight.
+
+    Returns rows {'cells', 'algorithm', 'seconds', 'expanded'}, both
+    averaged over the queries.
+    """
+    rng = random.Random(seed)
+    contenders = [('dijkstra', dijkstra), ('astar', astar)]
+    contenders += [(f'astar_{name}', partial(astar, heuristic=name))
+                   for name in ('euclidean', 'octile')]
+    contenders.append(('jps', jump_point_search))
+    rows = []
+    for size in sizes:
+        graph = grid_graph(size, size, obstacle_ratio, diagonal=True, seed=seed)
+        open_cells = [u for u in range(len(graph)) if graph.degree(u)]
+        pairs = [(rng.choice(open_cells), rng.choice(open_cells)) for _ in range(queries)]
+        expected = None
+        for name, function in contenders:
+            stats = SearchStats()
+            weights = []
+            start_time = time.perf_counter()
+            for start, goal in pairs:
+                weights.append(function(graph, start, goal, stats=stats)[1])
+            seconds = time.perf_counter() - start_time
+            if expected is None:
+                expected = weights
+            elif any(abs(a - b) > 1e-9 * max(a, 1) for a, b in zip(expected, weights) if a != b):
+                raise AssertionError(f"{name} differs from Dijkstra on the {size}x{size} grid")
+            rows.append({'cells': size * size, 'algorithm': name, 'seconds': seconds / queries,
+                         'expanded': stats.expanded / queries})
+    return rows
+
+
+def write_json(rows, filename, **parameters):
+    """
+    Save rows with the run parameters and the Python build they came from.
+    """
+    document = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            **parameters,
+        },
+        'rows': rows,
+    }
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+
+
+def write_csv(rows, filename):
+    """
+    Save rows as CSV with a header line.
+    """
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def compare_results(old_filename, new_filename, threshold=1.1, statistic='median'):
+    """
+    Match the rows of two write_json files by (algorithm, vertices,
+    degree) and return rows {'algorithm', 'vertices', 'degree', 'old',
+    'new', 'ratio'}, plus the list of those whose ratio exceeds threshold.
+    """
+    def load(filename):
+        with open(filename, encoding='utf-8') as f:
+            return {(row['algorithm'], row['vertices'], row['degree']): row[statistic]
+                    for row in json.load(f)['rows']}
+
+    old, new = load(old_filename), load(new_filename)
+    rows = []
+    for key in old:
+        if key in new:
+            algorithm, vertices, degree = key
+            rows.append({'algorithm': algorithm, 'vertices': vertices, 'degree': degree,
+                         'old': old[key], 'new': new[key], 'ratio': new[key] / old[key]})
+    return rows, [row for row in rows if row['ratio'] > threshold]
+
+
+def print_table(rows):
+    """
+    Print benchmark rows as an aligned text table.
+    """
+    if not rows:
+        return
+    columns = list(rows[0])
+    widths = [max(12, len(column), *(len(str(row[column])) for row in rows
+                                    if not isinstance(row[column], float)))
+              for column in columns]
+    print('  '.join(f"{column:>{width}}" for column, width in zip(columns, widths)))
+    for row in rows:
+        cells = []
+        for column, width in zip(columns, widths):
+            value = row[column]
+            cells.append(f"{value:>{width}.6g}" if isinstance(value, float) else f"{value:>{width}}")
+        print('  '.join(cells))
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    heaps = commands.add_parser('heaps', help="linear-scan Dijkstra against the heap variants")
+    heaps.add_argument('--sizes', type=int, nargs='+', default=[250, 500, 1000, 2000, 4000])
+    heaps.add_argument('--repeat', type=int, default=3)
+    heaps.add_argument('--seed', type=int, default=0)
+
+    suite = commands.add_parser('suite', help="all algorithms over a size and density sweep")
+    suite.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 200])
+    suite.add_argument('--degrees', type=int, nargs='+', default=[4, 8],
+                       help="average vertex degrees to sweep")
+    suite.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS))
+    suite.add_argument('--queries', type=int, default=5)
+    suite.add_argument('--warmup', type=int, default=1)
+    suite.add_argument('--repeat', type=int, default=5)
+    suite.add_argument('--keep-gc', action='store_true',
+                       help="leave the garbage collector on during timed runs")
+    suite.add_argument('--seed', type=int, default=0)
+    suite.add_argument('--stats', action='store_true',
+                       help="add search counters and peak memory per query")
+    suite.add_argument('--json')
+    suite.add_argument('--csv')
+
+    compare = commands.add_parser('compare', help="ratios between two suite --json files")
+    compare.add_argument('old')
+    compare.add_argument('new')
+    compare.add_argument('--threshold', type=float, default=1.1)
+    compare.add_argument('--statistic', default='median')
+
+    dynamic = commands.add_parser('dynamic', help="incremental repair against recomputation")
+    dynamic.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 1000])
+    dynamic.add_argument('--degree', type=int, default=4)
+    dynamic.add_argument('--updates', type=int, default=100)
+    dynamic.add_argument('--all-pairs-limit', type=int, default=400,
+                         help="largest graph that also gets an all-pairs matrix")
+    dynamic.add_argument('--seed', type=int, default=0)
+
+    pairs = commands.add_parser('pairs', help="Johnson's algorithm against Floyd-Warshall")
+    pairs.add_argument('--sizes', type=int, nargs='+', default=[250, 500, 1000])
+    pairs.add_argument('--degree', type=int, default=4)
+    pairs.add_argument('--workers', type=int)
+    pairs.add_argument('--floyd-limit', type=int, default=1000,
+                       help="largest graph Floyd-Warshall is timed on")
+    pairs.add_argument('--seed', type=int, default=0)
+
+    delta = commands.add_parser('delta', help="delta-stepping speedup over worker counts")
+    delta.add_argument('--sizes', type=int, nargs='+', default=[100000])
+    delta.add_argument('--degree', type=int, default=8)
+    delta.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    delta.add_argument('--delta', type=float, nargs='+', default=[None],
+                       help="bucket widths to try; default picks one from the weights")
+    delta.add_argument('--repeat', type=int, default=3)
+    delta.add_argument('--seed', type=int, default=0)
+
+    grid = commands.add_parser('grid', help="A* heuristics and Jump Point Search on grid maps")
+    grid.add_argument('--sizes', type=int, nargs='+', default=[100, 300])
+    grid.add_argument('--obstacles', type=float, default=0.2, help="share of blocked cells")
+    grid.add_argument('--queries', type=int, default=20)
+    grid.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == 'heaps':
+        print_table(compare_dijkstra(args.sizes, args.repeat, args.seed))
+    elif args.command == 'suite':
+        rows = run_suite(args.sizes, args.degrees, args.algorithms, args.queries,
+                         args.warmup, args.repeat, not args.keep_gc, args.seed, args.stats)
+        print_table(rows)
+        parameters = {key: value for key, value in vars(args).items()
+                      if key not in ('command', 'json', 'csv')}
+        if args.json:
+            write_json(rows, args.json, **parameters)
+        if args.csv:
+            write_csv(rows, args.csv)
+    elif args.command == 'dynamic':
+        print_table(compare_dynamic(args.sizes, args.degree, args.updates,
+                                    args.all_pairs_limit, args.seed))
+    elif args.command == 'pairs':
+        print_table(compare_all_pairs(args.sizes, args.degree, args.workers,
+                                      args.floyd_limit, args.seed))
+    elif args.command == 'delta':
+        print_table(delta_scaling(args.sizes, args.degree, args.workers, args.delta,
+                                  args.repeat, args.seed))
+    elif args.command == 'grid':
+        print_table(compare_grid(args.sizes, args.obstacles, args.queries, args.seed))
+    else:
+        rows, regressions = compare_results(args.old, args.new, args.threshold, args.statistic)
+        print_table(rows)
+        if regressions:
+            print(f"{len(regressions)} slower than x{args.threshold}:")
+            print_table(regressions)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Binary CSR graph files, opened with mmap, and a parse cache for text graphs.
+
+File layout (little-endian):
+
+    header    64 bytes: magic, version, flags, nodes, edges, label bytes
+    offsets   int64 x (nodes + 1)
+    targets   int32 x edges, padded to a multiple of 8 bytes
+    weights   int64 or float64 x edges
+    coords    float64 x 2 * nodes, only if the graph has coordinates
+    labels    label table
+
+The arrays are used in place through memoryviews of the mapping, so
+opening a graph costs one pass over the label table and nothing else.
+"""
+
+import hashlib
+import os
+import pickle
+import struct
+import sys
+import tempfile
+from array import array
+from mmap import ACCESS_READ, mmap
+
+from csr_graph import CSRGraph, as_csr
+from graph_utils import GRID_SUFFIX, LoadReport, load_compact_graph, load_grid_map
+
+MAGIC = b'PFGRAPH1'
+VERSION = 1
+HEADER = struct.Struct('<8sIIqqq')
+HEADER_SIZE = 64
+# Part of the cache key; bump it whenever the text parser changes.
+CACHE_VERSION = 2
+
+DIRECTED = 1
+INTEGRAL_WEIGHTS = 2
+PICKLED_LABELS = 4
+COORDS = 8
+
+
+def _padding(size):
+    return b'\0' * (-size % 8)
+
+
+def _encode_labels(labels):
+    """
+    Newline-separated UTF-8 when every label is a string without a
+    newline, a pickle otherwise.
+    """
+    if all(isinstance(label, str) and '\n' not in label for label in labels):
+        return '\n'.join(labels).encode('utf-8'), False
+    return pickle.dumps(labels, protocol=pickle.HIGHEST_PROTOCOL), True
+
+
+def _decode_labels(blob, pickled, count):
+    if pickled:
+        return pickle.loads(blob)
+    if not count:
+        return []
+    return bytes(blob).decode('utf-8').split('\n')
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def save_binary(graph, filename):
+    """
+    Write graph (dict or CSRGraph) to filename in the binary format.
+    The file is written next to the target and renamed into place, so a
+    reader never sees a half-written graph.
+    """
+    csr = as_csr(graph)
+    typecode = csr.weight_typecode
+    offsets = _little_endian(array('q', csr.offsets))
+    targets = _little_endian(array('i', csr.targets))
+    weights = _little_endian(array(typecode, csr.weights))
+    labels, pickled = _encode_labels(csr.labels)
+
+    flags = (DIRECTED if csr.directed else 0) | (INTEGRAL_WEIGHTS if typecode == 'q' else 0)
+    flags |= PICKLED_LABELS if pickled else 0
+    coords = None if csr.coords is None else _little_endian(array('d', csr.coords))
+    flags |= COORDS if coords is not None else 0
+    header = HEADER.pack(MAGIC, VERSION, flags, len(csr), csr.num_edges, len(labels))
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            f.write(offsets.tobytes())
+            f.write(targets.tobytes())
+            f.write(_padding(4 * len(targets)))
+            f.write(weights.tobytes())
+            if coords is not None:
+                f.write(coords.tobytes())
+            f.write(labels)
+        os.replace(temporary, filename)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def open_binary(filename):
+    """
+    Open a graph written by save_binary. Offsets, targets and weights are
+    read-only memoryviews of the mapped file.
+
+    Raises ValueError if the file is not a graph of this version.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'g.bin')
+    >>> save_binary(CSRGraph.from_edge_list([('a', 'b', 2), ('b', 'c', 3)]), path)
+    >>> graph = open_binary(path)
+    >>> graph['b'], graph.directed, graph.weight_typecode
+    ([('a', 2), ('c', 3)], False, 'q')
+    """
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+            raise ValueError(f"{filename} is not a binary graph file")
+        mapping = mmap(f.fileno(), 0, access=ACCESS_READ)
+    magic, version, flags, nodes, edges, label_size = HEADER.unpack_from(mapping)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{filename} is not a binary graph file of version {VERSION}")
+
+    view = memoryview(mapping)
+    position = HEADER_SIZE
+
+    def section(typecode, count, size):
+        nonlocal position
+        start = position
+        position += count * size
+        return view[start:position].cast(typecode)
+
+    offsets = section('q', nodes + 1, 8)
+    targets = section('i', edges, 4)
+    position += len(_padding(4 * edges))
+    weights = section('q' if flags & INTEGRAL_WEIGHTS else 'd', edges, 8)
+    coords = section('d', 2 * nodes, 8) if flags & COORDS else None
+    if sys.byteorder == 'big':
+        offsets, targets, weights = (_little_endian(array(part.format, part))
+                                     for part in (offsets, targets, weights))
+        coords = coords if coords is None else _little_endian(array('d', coords))
+    labels = _decode_labels(view[position:position + label_size], flags & PICKLED_LABELS, nodes)
+    return CSRGraph(labels, offsets, targets, weights, bool(flags & DIRECTED), coords)
+
+
+def cache_directory():
+    """
+    Where parsed graphs are cached: $PATHFINDING_CACHE, else
+    $XDG_CACHE_HOME/pathfinding-comparison, else ~/.cache/pathfinding-comparison.
+    """
+    if os.environ.get('PATHFINDING_CACHE'):
+        return os.environ['PATHFINDING_CACHE']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pathfinding-comparison')
+
+
+def _cache_path(filename, directed, cache_dir):
+    status = os.stat(filename)
+    key = f"{os.path.abspath(filename)}\0{status.st_size}\0{status.st_mtime_ns}\0{directed}\0{VERSION}.{CACHE_VERSION}"
+    name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir or cache_directory(), name + '.graph')
+
+
+def load_graph_cached(filename, directed=False, cache_dir=None):
+    """
+    Load a text edge-list file (or a grid map, by its .map suffix) as a
+    CSRGraph, going through the binary cache. The cache entry is keyed on
+    the file's path, size and modification time, so editing the file
+    invalidates it.
+
+    A missing file is reported and gives an empty graph, like
+    graph_utils.read_graph_from_file.
+
+    >>> import os, tempfile
+    >>> folder = tempfile.mkdtemp()
+    >>> path = os.path.join(folder, 'graph.txt')
+    >>> with open(path, 'w') as f:
+    ...     _ = f.write('a b 1\\nb c 2.5\\n')
+    >>> first = load_graph_cached(path, cache_dir=folder)
+    >>> second = load_graph_cached(path, cache_dir=folder)
+    >>> first['b'] == second['b'] == [('a', 1.0), ('c', 2.5)], type(second.weights)
+    (True, <class 'memoryview'>)
+    """
+    try:
+        cached = _cache_path(filename, directed, cache_dir)
+    except FileNotFoundError:
+        print(f"Файл {filename} не знайдено.")
+        return CSRGraph.from_edge_list([], directed)
+    try:
+        return open_binary(cached)
+    except (OSError, ValueError):
+        pass
+
+    report = LoadReport()
+    if filename.endswith(GRID_SUFFIX):
+        graph = load_grid_map(filename)
+    else:
+        graph = load_compact_graph(filename, directed, report=report)
+    if report:
+        print(f"Пропущено рядків у {filename}: {report}")
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        save_binary(graph, cached)
+    except OSError:
+        # A read-only or full cache only costs the next load its speed.
+        return graph
+    return open_binary(cached)
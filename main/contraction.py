@@ -0,0 +1,246 @@
+"""
+Contraction hierarchies: preprocessing once, fast point-to-point queries.
+
+Vertices are contracted one at a time in order of importance. Removing a
+vertex v adds a shortcut u -> w for every pair of neighbours whose only
+shortest connection ran through v. A query then runs a bidirectional
+Dijkstra that only ever moves to more important vertices, and shortcuts
+are expanded back into original edges at the end. Edge weights must be
+non-negative.
+"""
+
+import pickle
+from array import array
+from heapq import heapify, heappop, heappush
+
+from csr_graph import CSRGraph, as_csr, pack_edges
+
+
+class ContractionHierarchy:
+    """
+    Upward search graphs of a contracted graph.
+
+    `forward` holds edges u -> w with rank[w] > rank[u]; `backward` holds
+    reversed edges, so a search from the goal also only climbs in rank.
+    `shortcuts` maps a shortcut (u, w) to the vertex it bypasses.
+
+    >>> graph = {'a': [('b', 1), ('c', 4)], 'b': [('c', 1), ('d', 5)], 'c': [('d', 1)], 'd': []}
+    >>> hierarchy = ContractionHierarchy.build(graph)
+    >>> hierarchy.query('a', 'd')
+    (['a', 'b', 'c', 'd'], 3)
+    >>> hierarchy.query('d', 'a')
+    ([], inf)
+    """
+
+    def __init__(self, labels, rank, forward, backward, shortcuts):
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.rank = rank
+        self.forward = forward
+        self.backward = backward
+        self.shortcuts = shortcuts
+
+    @classmethod
+    def build(cls, graph, directed=False, witness_limit=64):
+        """
+        Contract graph and return its hierarchy.
+
+        param graph: dict or CSRGraph, or an edge list of (a, b, weight)
+        tuples as returned by graph_utils.read_graph_from_file
+
+        param directed: only used for edge lists
+
+        param witness_limit: vertices settled by each witness search; a
+        smaller limit preprocesses faster but may add unneeded shortcuts
+        """
+        if isinstance(graph, list):
+            csr = CSRGraph.from_edge_list(graph, directed)
+        else:
+            csr = as_csr(graph)
+        n = len(csr)
+        infinity = float('inf')
+
+        out_edges = [{} for _ in range(n)]
+        in_edges = [{} for _ in range(n)]
+        for u, w, weight in csr.edges():
+            if u != w and weight < out_edges[u].get(w, infinity):
+                out_edges[u][w] = weight
+                in_edges[w][u] = weight
+
+        def witness_distances(source, excluded, max_distance):
+            distances = {source: 0}
+            queue = [(0, source)]
+            settled = 0
+            while queue and settled < witness_limit:
+                distance, vertex = heappop(queue)
+                if distance > distances[vertex]:
+                    continue
+                if distance > max_distance:
+                    break
+                settled += 1
+                for neighbor, weight in out_edges[vertex].items():
+                    if neighbor == excluded:
+                        continue
+                    new_distance = distance + weight
+                    if new_distance < distances.get(neighbor, infinity):
+                        distances[neighbor] = new_distance
+                        heappush(queue, (new_distance, neighbor))
+            return distances
+
+        def needed_shortcuts(vertex):
+            shortcuts = []
+            for u, weight_in in in_edges[vertex].items():
+                via = {w: weight_in + weight_out
+                       for w, weight_out in out_edges[vertex].items() if w != u}
+                if not via:
+                    continue
+                distances = witness_distances(u, vertex, max(via.values()))
+                for w, weight in via.items():
+                    if distances.get(w, infinity) > weight:
+                        shortcuts.append((u, w, weight))
+            return shortcuts
+
+        contracted_neighbors = [0] * n
+
+        def priority(vertex, shortcuts):
+            edge_difference = len(shortcuts) - len(in_edges[vertex]) - len(out_edges[vertex])
+            return edge_difference + contracted_neighbors[vertex]
+
+        queue = [(priority(vertex, needed_shortcuts(vertex)), vertex) for vertex in range(n)]
+        heapify(queue)
+
+        rank = array('i', bytes(4 * n))
+        up_sources, up_targets, up_weights = array('i'), array('i'), []
+        down_sources, down_targets, down_weights = array('i'), array('i'), []
+        shortcut_middle = {}
+        order = 0
+        while queue:
+            _, vertex = heappop(queue)
+            # Lazy update: priorities change as neighbours get contracted.
+            shortcuts = needed_shortcuts(vertex)
+            current = priority(vertex, shortcuts)
+            if queue and current > queue[0][0]:
+                heappush(queue, (current, vertex))
+                continue
+
+            rank[vertex] = order
+            order += 1
+            for w, weight in out_edges[vertex].items():
+                up_sources.append(vertex)
+                up_targets.append(w)
+                up_weights.append(weight)
+            for u, weight in in_edges[vertex].items():
+                down_sources.append(vertex)
+                down_targets.append(u)
+                down_weights.append(weight)
+
+            for u, w, weight in shortcuts:
+                if weight < out_edges[u].get(w, infinity):
+                    out_edges[u][w] = weight
+                    in_edges[w][u] = weight
+                    shortcut_middle[(u, w)] = vertex
+
+            for w in out_edges[vertex]:
+                del in_edges[w][vertex]
+                contracted_neighbors[w] += 1
+            for u in in_edges[vertex]:
+                del out_edges[u][vertex]
+                contracted_neighbors[u] += 1
+            out_edges[vertex] = in_edges[vertex] = {}
+
+        typecode = csr.weight_typecode
+        forward = pack_edges(n, up_sources, up_targets, array(typecode, up_weights))
+        backward = pack_edges(n, down_sources, down_targets, array(typecode, down_weights))
+        return cls(csr.labels, rank, forward, backward, shortcut_middle)
+
+    def query(self, start, goal):
+        """
+        Shortest path from start to goal, returned as a
+        tuple (path: list of nodes, weight) with shortcuts expanded.
+        """
+        if start not in self.index or goal not in self.index:
+            return [], float('inf')
+        start, goal = self.index[start], self.index[goal]
+
+        distances = ({start: 0}, {goal: 0})
+        parents = ({start: None}, {goal: None})
+        queues = ([(0, start)], [(0, goal)])
+        best, meeting = float('inf'), None
+        while queues[0] or queues[1]:
+            for side in (0, 1):
+                queue = queues[side]
+                if not queue:
+                    continue
+                distance, vertex = heappop(queue)
+                own = distances[side]
+                if distance > own[vertex]:
+                    continue
+                if distance >= best:
+                    queue.clear()
+                    continue
+                other = distances[1 - side]
+                if vertex in other and distance + other[vertex] < best:
+                    best, meeting = distance + other[vertex], vertex
+
+                offsets, targets, weights = self.forward if side == 0 else self.backward
+                lo, hi = offsets[vertex], offsets[vertex + 1]
+                for neighbor, weight in zip(targets[lo:hi], weights[lo:hi]):
+                    new_distance = distance + weight
+                    if new_distance < own.get(neighbor, float('inf')):
+                        own[neighbor] = new_distance
+                        parents[side][neighbor] = vertex
+                        heappush(queue, (new_distance, neighbor))
+
+        if meeting is None:
+            return [], float('inf')
+
+        up_path = [meeting]
+        while parents[0][up_path[-1]] is not None:
+            up_path.append(parents[0][up_path[-1]])
+        up_path.reverse()
+        down_path = [meeting]
+        while parents[1][down_path[-1]] is not None:
+            down_path.append(parents[1][down_path[-1]])
+        hops = up_path + down_path[1:]
+
+        path = [hops[0]]
+        for u, w in zip(hops, hops[1:]):
+            self._unpack(u, w, path)
+        return [self.labels[vertex] for vertex in path], best
+
+    def _unpack(self, u, w, path):
+        """
+        Append the original vertices of edge u -> w (without u) to path.
+        """
+        stack = [(u, w)]
+        while stack:
+            a, b = stack.pop()
+            middle = self.shortcuts.get((a, b))
+            if middle is None:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+
+    def save(self, filename):
+        """
+        Write the hierarchy to filename.
+        """
+        with open(filename, 'wb') as f:
+            pickle.dump({
+                'labels': self.labels,
+                'rank': self.rank,
+                'forward': self.forward,
+                'backward': self.backward,
+                'shortcuts': self.shortcuts,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read a hierarchy written by save.
+        """
+        with open(filename, 'rb') as f:
+            data = pickle.load(f)
+        return cls(data['labels'], data['rank'], data['forward'], data['backward'],
+                   data['shortcuts'])
@@ -0,0 +1,324 @@
+"""
+Compact array-backed graph representation (compressed sparse rows).
+"""
+
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+
+def _weight_typecode(weights):
+    """
+    Integer weights are stored as 'q', anything else as 'd',
+    so sums of weights keep the type the caller passed in.
+    """
+    for weight in weights:
+        if isinstance(weight, bool) or not isinstance(weight, int):
+            return 'd'
+    return 'q'
+
+
+def _storage_typecode(values):
+    """
+    Item typecode of an array or a cast memoryview, None for other sequences.
+    """
+    if isinstance(values, array):
+        return values.typecode
+    if isinstance(values, memoryview):
+        return values.format
+    return None
+
+
+def pack_edges(num_nodes, sources, targets, weights):
+    """
+    Counting-sort parallel edge arrays by source node id into
+    (offsets, targets, weights) CSR arrays. The relative order of the
+    edges leaving one node is preserved.
+    """
+    offsets = array('q', bytes(8 * (num_nodes + 1)))
+    for u in sources:
+        offsets[u + 1] += 1
+    for u in range(num_nodes):
+        offsets[u + 1] += offsets[u]
+
+    position = array('q', offsets[:num_nodes])
+    typecode = _storage_typecode(weights) or _weight_typecode(weights)
+    out_targets = array('i', bytes(4 * len(sources)))
+    out_weights = array(typecode, [0]) * len(sources)
+    for u, v, weight in zip(sources, targets, weights):
+        slot = position[u]
+        out_targets[slot] = v
+        out_weights[slot] = weight
+        position[u] = slot + 1
+    return offsets, out_targets, out_weights
+
+
+class SearchState:
+    """
+    Per-vertex arrays of one search, indexed by node id: distances
+    (inf when unreached), previous (None) and a flags bytearray (0).
+
+    Searches append every vertex whose entries they change to touched, and
+    reset() restores just those, so a search that reaches k vertices of a
+    large graph costs O(k) to set up instead of O(n).
+
+    >>> state = SearchState(3)
+    >>> state.distances[1] = 5; state.flags[1] = 1; state.touched.append(1)
+    >>> state.reset()
+    >>> state.distances, bytes(state.flags), state.touched
+    ([inf, inf, inf], b'\\x00\\x00\\x00', [])
+    """
+
+    __slots__ = ('distances', 'previous', 'flags', 'touched')
+
+    def __init__(self, size):
+        self.distances = [float('inf')] * size
+        self.previous = [None] * size
+        self.flags = bytearray(size)
+        self.touched = []
+
+    def reset(self):
+        """
+        Put every touched vertex back to its initial entries.
+        """
+        distances, previous, flags = self.distances, self.previous, self.flags
+        infinity = float('inf')
+        for vertex in self.touched:
+            distances[vertex] = infinity
+            previous[vertex] = None
+            flags[vertex] = 0
+        self.touched.clear()
+
+
+class CSRGraph(Mapping):
+    """
+    Graph with contiguous node ids 0..n-1 stored in three flat arrays:
+    out-edges of node u are targets[offsets[u]:offsets[u + 1]] with the
+    matching entries of weights.
+
+    The original node labels are kept in `labels` (id -> label) and
+    `index` (label -> id). `coords`, if known, holds x and y of node u at
+    coords[2 * u] and coords[2 * u + 1]. The class is a read-only Mapping from label to
+    a list of (neighbor label, weight) tuples, so code written for the
+    dict form of `graph_utils.build_graph` keeps working with it.
+
+    >>> g = CSRGraph.from_edge_list([('a', 'b', 2), ('b', 'c', 3)], directed=True)
+    >>> len(g), g.num_edges
+    (3, 2)
+    >>> g['a'], list(g.neighbors(g.index['b']))
+    ([('b', 2)], [(2, 3)])
+    """
+
+    __slots__ = ('labels', 'index', 'offsets', 'targets', 'weights', 'directed', 'coords',
+                 '_reverse', '_states', '_weight_range', '__weakref__')
+
+    # Graphs compare by identity: comparing millions of edges by value is
+    # never what a cache lookup wants.
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __init__(self, labels, offsets, targets, weights, directed=False, coords=None):
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.directed = directed
+        self.coords = coords
+        self._reverse = None
+        self._states = []
+        self._weight_range = None
+
+    @classmethod
+    def from_arrays(cls, labels, sources, targets, weights, directed=True):
+        """
+        Build the graph from parallel arrays of edge endpoints (node ids)
+        and weights. Every pair is stored as given, so for an undirected
+        graph both directions must already be present.
+        """
+        offsets, out_targets, out_weights = pack_edges(len(labels), sources, targets, weights)
+        return cls(labels, offsets, out_targets, out_weights, directed)
+
+    @classmethod
+    def from_edge_list(cls, edge_list, directed=False):
+        """
+        Build the graph from a list of (a, b, weight) tuples, in the same
+        neighbor order as `graph_utils.build_graph`.
+        """
+        index = {}
+        labels = []
+        sources = array('i')
+        targets = array('i')
+        weights = []
+        for a, b, weight in edge_list:
+            for label in (a, b):
+                if label not in index:
+                    index[label] = len(labels)
+                    labels.append(label)
+            sources.append(index[a])
+            targets.append(index[b])
+            weights.append(weight)
+            if not directed:
+                sources.append(index[b])
+                targets.append(index[a])
+                weights.append(weight)
+        weights = array(_weight_typecode(weights), weights)
+        return cls.from_arrays(labels, sources, targets, weights, directed)
+
+    @classmethod
+    def from_dict(cls, graph, directed=True):
+        """
+        Build the graph from the dict form {node: [(neighbor, weight), ...]}.
+        Nodes that only appear as neighbors get an id as well.
+        """
+        index = {label: i for i, label in enumerate(graph)}
+        labels = list(graph)
+        offsets = array('q', [0])
+        targets = array('i')
+        weights = []
+        for neighbors in graph.values():
+            for neighbor, weight in neighbors:
+                if neighbor not in index:
+                    index[neighbor] = len(labels)
+                    labels.append(neighbor)
+                targets.append(index[neighbor])
+                weights.append(weight)
+            offsets.append(len(targets))
+        offsets.extend([len(targets)] * (len(labels) - len(graph)))
+        return cls(labels, offsets, targets, array(_weight_typecode(weights), weights), directed)
+
+    @property
+    def weight_typecode(self):
+        """
+        'q' when all weights are integers, 'd' otherwise.
+        """
+        return _storage_typecode(self.weights) or _weight_typecode(self.weights)
+
+    @property
+    def num_edges(self):
+        """
+        Number of stored (directed) edges.
+        """
+        return len(self.targets)
+
+    def neighbors(self, u):
+        """
+        Iterate over (neighbor id, weight) pairs of node id u.
+        """
+        lo, hi = self.offsets[u], self.offsets[u + 1]
+        return zip(self.targets[lo:hi], self.weights[lo:hi])
+
+    def degree(self, u):
+        """
+        Out-degree of node id u.
+        """
+        return self.offsets[u + 1] - self.offsets[u]
+
+    def edges(self):
+        """
+        Iterate over (u, v, weight) id triples of all stored edges.
+        """
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        for u in range(len(self.labels)):
+            for i in range(offsets[u], offsets[u + 1]):
+                yield u, targets[i], weights[i]
+
+    def reverse(self):
+        """
+        Graph with every edge turned around. Undirected graphs are their
+        own reverse. It is built on the first call and kept, so searches
+        that walk backwards do not rebuild it per query.
+        """
+        if not self.directed:
+            return self
+        if self._reverse is None:
+            sources = array('i')
+            for u in range(len(self.labels)):
+                sources.extend([u] * self.degree(u))
+            reverse = CSRGraph.from_arrays(self.labels, self.targets, sources,
+                                           self.weights, directed=True)
+            reverse.coords = self.coords
+            reverse._reverse = self
+            self._reverse = reverse
+        return self._reverse
+
+    @contextmanager
+    def search_state(self):
+        """
+        Borrow a SearchState sized for this graph; it is reset and kept
+        for the next search when the with block ends.
+
+        >>> g = CSRGraph.from_edge_list([('a', 'b', 1)])
+        >>> with g.search_state() as state:
+        ...     state.distances
+        [inf, inf]
+        """
+        state = self._states.pop() if self._states else SearchState(len(self.labels))
+        try:
+            yield state
+        finally:
+            state.reset()
+            self._states.append(state)
+
+    def position(self, u):
+        """
+        (x, y) of node id u, or None when the graph has no coordinates.
+        """
+        if self.coords is None:
+            return None
+        return self.coords[2 * u], self.coords[2 * u + 1]
+
+    def weight_range(self):
+        """
+        (smallest, largest) edge weight, (0, 0) for a graph without edges.
+        Computed on the first call and kept.
+        """
+        if self._weight_range is None:
+            weights = self.weights
+            self._weight_range = (min(weights), max(weights)) if len(weights) else (0, 0)
+        return self._weight_range
+
+    def min_weight(self):
+        """
+        Smallest edge weight, 0 for a graph without edges.
+        """
+        return self.weight_range()[0]
+
+    def path_labels(self, path):
+        """
+        Translate a list of node ids back to node labels.
+        """
+        labels = self.labels
+        return [labels[u] for u in path]
+
+    def to_dict(self):
+        """
+        Convert to the dict form used by `graph_utils.build_graph`.
+        """
+        return {label: self[label] for label in self.labels}
+
+    def __getitem__(self, label):
+        u = self.index[label]
+        labels = self.labels
+        return [(labels[v], weight) for v, weight in self.neighbors(u)]
+
+    def __contains__(self, label):
+        return label in self.index
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __repr__(self):
+        return f"CSRGraph(nodes={len(self.labels)}, edges={self.num_edges}, directed={self.directed})"
+
+
+def as_csr(graph):
+    """
+    Return graph as a CSRGraph, converting the dict form if needed.
+    """
+    if isinstance(graph, CSRGraph):
+        return graph
+    return CSRGraph.from_dict(graph)
@@ -0,0 +1,224 @@
+"""
+Delta-stepping single-source shortest paths with NumPy batch relaxation.
+
+Vertices are kept in buckets of width delta by tentative distance. The
+lowest bucket is emptied by relaxing the light edges (weight <= delta) of
+all its vertices at once, repeatedly, since light edges can put vertices
+back into the same bucket; then the heavy edges of everything the bucket
+settled are relaxed once. delta = min weight gives Dijkstra's order,
+delta = inf gives Bellman-Ford.
+
+For workers > 1 the EdgeArray is split into parts by edge target, with
+about the same number of edges each. A thread per part relaxes the
+frontier's edges into its own targets, so writes never collide; the
+NumPy work inside a part runs without the GIL.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from vectorized import EdgeArray
+
+
+def _by_source(n, sources, targets, weights):
+    """
+    CSR arrays (offsets, targets, weights) of an edge subset.
+    """
+    order = np.argsort(sources, kind='stable')
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    return offsets, targets[order], weights[order]
+
+
+def _gather(part, frontier, base):
+    """
+    Edges of part leaving the frontier vertices: sources, targets and
+    candidate distances base[source] + weight.
+    """
+    offsets, targets, weights = part
+    lo = offsets[frontier]
+    counts = offsets[frontier + 1] - lo
+    total = int(counts.sum())
+    if not total:
+        return None
+    # Concatenated ranges lo[i]:lo[i] + counts[i] without a Python loop.
+    starts = np.cumsum(counts) - counts
+    index = np.arange(total) + np.repeat(lo - starts, counts)
+    return (np.repeat(frontier, counts), targets[index],
+            np.repeat(base, counts) + weights[index])
+
+
+class DeltaStepping:
+    """
+    Delta-stepping over one graph, with the light/heavy edge split and the
+    per-worker parts built once for any number of searches.
+
+    >>> search = DeltaStepping({'a': [('b', 1), ('c', 5)], 'b': [('c', 1)], 'c': []}, delta=2)
+    >>> distances, predecessors = search.search(0)
+    >>> distances.tolist(), predecessors.tolist()
+    ([0.0, 1.0, 2.0], [-1, 0, 1])
+    >>> search.path('a', 'c')
+    (['a', 'b', 'c'], 2)
+    """
+
+    def __init__(self, graph, delta=None, workers=1):
+        """
+        param graph: dict, CSRGraph or EdgeArray with non-negative weights
+
+        param delta: bucket width; default is the largest weight divided
+        by the average out-degree
+
+        param workers: threads relaxing edges in parallel
+        """
+        edges = graph if isinstance(graph, EdgeArray) else EdgeArray.from_graph(graph)
+        n, weights = len(edges), edges.weights
+        if len(weights) and weights.min() < 0:
+            raise ValueError("Delta-stepping needs non-negative edge weights")
+        if delta is None:
+            average_degree = len(weights) / n if n else 0
+            delta = weights.max() / average_degree if len(weights) and weights.max() > 0 else 1.0
+        if delta <= 0:
+            raise ValueError("delta must be positive")
+        self.edges = edges
+        self.delta = float(delta)
+        self.workers = max(1, workers)
+
+        # EdgeArray is sorted by target, so equal slices of it give parts
+        # with disjoint target ranges; a split never divides a target.
+        bounds = [0]
+        for k in range(1, self.workers):
+            split = len(weights) * k // self.workers
+            split = int(np.searchsorted(edges.targets, edges.targets[split], 'left')) \
+                if split < len(weights) else len(weights)
+            bounds.append(max(split, bounds[-1]))
+        bounds.append(len(weights))
+        self.parts = []
+        for lo, hi in zip(bounds, bounds[1:]):
+            sources, targets, part_weights = (edges.sources[lo:hi], edges.targets[lo:hi],
+                                              weights[lo:hi])
+            light = part_weights <= self.delta
+            self.parts.append((_by_source(n, sources[light], targets[light], part_weights[light]),
+                               _by_source(n, sources[~light], targets[~light],
+                                          part_weights[~light])))
+
+    def _relax(self, kind, frontier, distances, predecessors, pool):
+        """
+        Relax the light (kind 0) or heavy (kind 1) edges leaving frontier.
+        Returns the ids whose distance dropped.
+        """
+        base = distances[frontier]
+
+        def relax_part(parts):
+            gathered = _gather(parts[kind], frontier, base)
+            if gathered is None:
+                return None
+            sources, targets, candidates = gathered
+            better = candidates < distances[targets]
+            if not better.any():
+                return None
+            sources, targets, candidates = sources[better], targets[better], candidates[better]
+            np.minimum.at(distances, targets, candidates)
+            winners = candidates == distances[targets]
+            predecessors[targets[winners]] = sources[winners]
+            return np.unique(targets)
+
+        if pool is None:
+            results = [relax_part(parts) for parts in self.parts]
+        else:
+            results = list(pool.map(relax_part, self.parts))
+        results = [result for result in results if result is not None]
+        return np.concatenate(results) if results else np.empty(0, dtype=np.int64)
+
+    def search(self, start):
+        """
+        Shortest paths from node id start to every vertex.
+
+        returns (distances, predecessors): NumPy arrays of distances (inf
+        when unreachable) and predecessor ids (-1 for none)
+        """
+        n = len(self.edges)
+        distances = np.full(n, np.inf)
+        predecessors = np.full(n, -1, dtype=np.int64)
+        done = np.zeros(n, dtype=bool)
+        distances[start] = 0
+        # Vertices reached but not yet settled; may hold duplicates and
+        # settled ids, which are dropped when the next bucket is chosen.
+        pending = np.array([start], dtype=np.int64)
+
+        pool = ThreadPoolExecutor(self.workers) if self.workers > 1 else None
+        try:
+            while True:
+                pending = np.unique(pending[~done[pending]])
+                if not len(pending):
+                    break
+                lowest = distances[pending].min()
+                upper = (lowest // self.delta + 1) * self.delta
+                if upper <= lowest:
+                    # Rounding of a float bucket boundary; a bucket may
+                    # span at most delta above its minimum.
+                    upper = lowest + self.delta
+                in_bucket = distances[pending] < upper
+                frontier, pending = pending[in_bucket], pending[~in_bucket]
+
+                settled = []
+                while len(frontier):
+                    settled.append(frontier)
+                    done[frontier] = True
+                    improved = self._relax(0, frontier, distances, predecessors, pool)
+                    again = distances[improved] < upper
+                    frontier = np.unique(improved[again])
+                    pending = np.concatenate((pending, improved[~again]))
+                settled = np.unique(np.concatenate(settled))
+                improved = self._relax(1, settled, distances, predecessors, pool)
+                pending = np.concatenate((pending, improved))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return distances, predecessors
+
+    def path(self, start, goal):
+        """
+        Shortest path from start to goal (labels), returned as a
+        tuple (path: list of nodes, weight).
+        """
+        edges = self.edges
+        if start not in edges.index or goal not in edges.index:
+            return [], float('inf')
+        start, goal = edges.index[start], edges.index[goal]
+        distances, predecessors = self.search(start)
+        if distances[goal] == np.inf:
+            return [], float('inf')
+        path = [goal]
+        while path[-1] != start:
+            path.append(int(predecessors[path[-1]]))
+        path.reverse()
+        return [edges.labels[u] for u in path], edges.weight_value(distances[goal].item())
+
+
+def delta_stepping(graph, start, goal, delta=None, workers=1):
+    """
+    Shortest path by delta-stepping.
+
+    param graph: dict, CSRGraph, EdgeArray or a DeltaStepping (build that
+    once to reuse the edge split across queries; delta and workers are
+    then ignored)
+
+    param start: The starting node
+
+    param goal: The goal node
+
+    param delta: bucket width, see DeltaStepping
+
+    param workers: threads relaxing edges in parallel
+
+    returns shortest path, which is presented in a
+    tuple (path: list of nodes, weight)
+
+    >>> graph = {'A': [('B', 4), ('C', 1)], 'B': [('D', 1)], 'C': [('B', 2)], 'D': []}
+    >>> delta_stepping(graph, 'A', 'D'), delta_stepping(graph, 'A', 'D', delta=1, workers=2)
+    ((['A', 'C', 'B', 'D'], 4), (['A', 'C', 'B', 'D'], 4))
+    """
+    if not isinstance(graph, DeltaStepping):
+        graph = DeltaStepping(graph, delta, workers)
+    return graph.path(start, goal)
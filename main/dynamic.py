@@ -0,0 +1,311 @@
+"""
+Graphs whose edge weights change, with shortest paths repaired in place.
+
+A DynamicGraph keeps every shortest-path tree and all-pairs matrix taken
+from it up to date. After each change only the vertices (or pairs) whose
+distance may have changed are recomputed:
+
+    decrease   a search from the edge's head over the vertices that get
+               closer (for all pairs: one O(n^2) pass through the edge)
+    increase   only if the edge is on a shortest path: the vertices below
+               it are reset and settled again from their unaffected
+               in-neighbours, with a search limited to them
+
+Weights must be non-negative, as for Dijkstra.
+"""
+
+import heapq
+
+import numpy as np
+
+from all_pairs import floyd_warshall_matrix
+from csr_graph import CSRGraph, as_csr
+from shortest_path_tree import single_source
+
+
+def _propagate_decrease(out_edges, distances, previous, start):
+    """
+    Dijkstra from start, whose distance just dropped, over the vertices
+    that get closer through it.
+    """
+    heap = [(distances[start], start)]
+    while heap:
+        distance, vertex = heapq.heappop(heap)
+        if distance > distances[vertex]:
+            continue
+        for neighbor, weight in out_edges[vertex].items():
+            new_distance = distance + weight
+            if new_distance < distances[neighbor]:
+                distances[neighbor] = new_distance
+                previous[neighbor] = vertex
+                heapq.heappush(heap, (new_distance, neighbor))
+
+
+def _repair(in_edges, out_edges, distances, affected):
+    """
+    Settle the affected vertices again. Every other vertex must already
+    hold its correct distance in distances.
+
+    Returns (distances, previous, order) for the affected vertices only:
+    two dicts and the list of those reached, in the order they settled.
+    """
+    inf = float('inf')
+    best = {}
+    previous = {}
+    heap = []
+    for vertex in affected:
+        best[vertex], previous[vertex] = inf, None
+        for neighbor, weight in in_edges[vertex].items():
+            if neighbor not in affected and distances[neighbor] + weight < best[vertex]:
+                best[vertex], previous[vertex] = distances[neighbor] + weight, neighbor
+        if previous[vertex] is not None:
+            heap.append((best[vertex], vertex))
+    heapq.heapify(heap)
+
+    order = []
+    settled = set()
+    while heap:
+        distance, vertex = heapq.heappop(heap)
+        if vertex in settled or distance > best[vertex]:
+            continue
+        settled.add(vertex)
+        order.append(vertex)
+        for neighbor, weight in out_edges[vertex].items():
+            if neighbor in affected and neighbor not in settled and distance + weight < best[neighbor]:
+                best[neighbor] = distance + weight
+                previous[neighbor] = vertex
+                heapq.heappush(heap, (distance + weight, neighbor))
+    return best, previous, order
+
+
+class DynamicGraph:
+    """
+    Mutable graph over node ids with the labels/index of a CSRGraph.
+    Parallel edges are merged, keeping the lightest.
+
+    >>> graph = DynamicGraph({'A': [('B', 1), ('C', 5)], 'B': [('C', 1)], 'C': []})
+    >>> tree = graph.shortest_path_tree('A')
+    >>> pairs = graph.all_pairs()
+    >>> tree.path('C')
+    (['A', 'B', 'C'], 2)
+    >>> graph.update_weight('B', 'C', 10)
+    >>> tree.path('C'), pairs.path('A', 'C')
+    ((['A', 'C'], 5), (['A', 'C'], 5))
+    >>> graph.insert_edge('A', 'D', 1)
+    >>> graph.insert_edge('D', 'C', 1)
+    >>> tree.path('C'), pairs.path('B', 'C')
+    ((['A', 'D', 'C'], 2), (['B', 'C'], 10))
+    >>> graph.delete_edge('A', 'D')
+    >>> tree.path('C'), pairs.distance('A', 'D')
+    ((['A', 'C'], 5), inf)
+    """
+
+    def __init__(self, graph, directed=None):
+        """
+        param graph: dict or CSRGraph; a dict is read as given, so an
+        undirected one must list both directions
+
+        param directed: whether insert/update/delete touch one direction
+        only; defaults to the CSRGraph's flag (True for a dict)
+        """
+        csr = as_csr(graph)
+        self.directed = csr.directed if directed is None else directed
+        self.labels = list(csr.labels)
+        self.index = dict(csr.index)
+        self.out_edges = [{} for _ in self.labels]
+        self.in_edges = [{} for _ in self.labels]
+        for u in range(len(csr)):
+            for v, weight in csr.neighbors(u):
+                if weight < 0:
+                    raise ValueError(f"Negative weight on edge {self.labels[u]} -> {self.labels[v]}")
+                if weight < self.out_edges[u].get(v, float('inf')):
+                    self.out_edges[u][v] = self.in_edges[v][u] = weight
+        self.trees = []
+        self.pairs = []
+
+    def __len__(self):
+        return len(self.labels)
+
+    def path_labels(self, path):
+        """
+        Translate a list of node ids back to labels.
+        """
+        labels = self.labels
+        return [labels[u] for u in path]
+
+    def to_csr(self):
+        """
+        Snapshot of the current graph as a CSRGraph with the same node ids.
+        """
+        sources, targets, weights = [], [], []
+        for u, edges in enumerate(self.out_edges):
+            for v, weight in edges.items():
+                sources.append(u)
+                targets.append(v)
+                weights.append(weight)
+        return CSRGraph.from_arrays(self.labels, sources, targets, weights, self.directed)
+
+    def shortest_path_tree(self, start):
+        """
+        shortest_path_tree.ShortestPathTree from start that follows every
+        later change of the graph.
+        """
+        tree = single_source(self.to_csr(), start)
+        tree.graph = self
+        tree.dist = list(tree.dist)
+        tree.previous = list(tree.previous)
+        self.trees.append(tree)
+        return tree
+
+    def all_pairs(self):
+        """
+        all_pairs.AllPairs that follows every later change of the graph.
+        """
+        pairs = floyd_warshall_matrix(self.to_csr())
+        self.pairs.append(pairs)
+        return pairs
+
+    def detach(self, result):
+        """
+        Stop updating a tree or matrix returned by this graph.
+        """
+        for tracked in (self.trees, self.pairs):
+            if any(item is result for item in tracked):
+                tracked[:] = [item for item in tracked if item is not result]
+
+    def _node(self, label):
+        if label not in self.index:
+            self.index[label] = len(self.labels)
+            self.labels.append(label)
+            self.out_edges.append({})
+            self.in_edges.append({})
+            for tree in self.trees:
+                tree.dist.append(float('inf'))
+                tree.previous.append(None)
+            for pairs in self.pairs:
+                self._grow(pairs, label)
+        return self.index[label]
+
+    @staticmethod
+    def _grow(pairs, label):
+        pairs.index[label] = len(pairs.labels)
+        pairs.labels.append(label)
+        n = len(pairs.labels)
+        dist = np.full((n, n), np.inf)
+        dist[:-1, :-1] = pairs.dist
+        dist[-1, -1] = 0
+        next_hop = np.full((n, n), -1, dtype=pairs.next_hop.dtype)
+        next_hop[:-1, :-1] = pairs.next_hop
+        next_hop[-1, -1] = n - 1
+        pairs.dist, pairs.next_hop = dist, next_hop
+
+    def _edge(self, a, b):
+        if a not in self.index or b not in self.index or \
+                self.index[b] not in self.out_edges[self.index[a]]:
+            raise ValueError(f"No edge {a} -> {b}")
+        return self.index[a], self.index[b]
+
+    def insert_edge(self, a, b, weight):
+        """
+        Add the edge a -> b (and b -> a if undirected), creating missing
+        nodes. An existing edge gets the new weight.
+        """
+        if weight < 0:
+            raise ValueError(f"Negative weight on edge {a} -> {b}")
+        u, v = self._node(a), self._node(b)
+        for head, tail in ((u, v), (v, u))[:1 if self.directed else 2]:
+            self._set(head, tail, weight)
+        for pairs in self.pairs:
+            pairs.integral = pairs.integral and isinstance(weight, int)
+
+    def update_weight(self, a, b, weight):
+        """
+        Change the weight of the existing edge a -> b (and b -> a if
+        undirected). Raises ValueError if there is no such edge.
+        """
+        u, v = self._edge(a, b)
+        self.insert_edge(self.labels[u], self.labels[v], weight)
+
+    def delete_edge(self, a, b):
+        """
+        Remove the edge a -> b (and b -> a if undirected). Raises
+        ValueError if there is no such edge.
+        """
+        u, v = self._edge(a, b)
+        for head, tail in ((u, v), (v, u))[:1 if self.directed else 2]:
+            self._set(head, tail, None)
+
+    def _set(self, u, v, weight):
+        """
+        Set the weight of u -> v (None deletes it) and repair everything
+        that is tracked.
+        """
+        old = self.out_edges[u].get(v)
+        if weight is None:
+            self.out_edges[u].pop(v, None)
+            self.in_edges[v].pop(u, None)
+        else:
+            self.out_edges[u][v] = self.in_edges[v][u] = weight
+        if old == weight:
+            return
+        increased = weight is None or (old is not None and weight > old)
+        for tree in self.trees:
+            if increased:
+                self._tree_increase(tree, u, v)
+            else:
+                self._tree_decrease(tree, u, v, weight)
+        for pairs in self.pairs:
+            if increased:
+                self._pairs_increase(pairs, u, v, old)
+            else:
+                self._pairs_decrease(pairs, u, v, weight)
+
+    def _tree_decrease(self, tree, u, v, weight):
+        if tree.dist[u] + weight < tree.dist[v]:
+            tree.dist[v] = tree.dist[u] + weight
+            tree.previous[v] = u
+            _propagate_decrease(self.out_edges, tree.dist, tree.previous, v)
+
+    def _tree_increase(self, tree, u, v):
+        if tree.previous[v] != u:
+            return
+        # Only the subtree below v used the edge.
+        affected = {v}
+        stack = [v]
+        while stack:
+            vertex = stack.pop()
+            for child in self.out_edges[vertex]:
+                if tree.previous[child] == vertex and child not in affected:
+                    affected.add(child)
+                    stack.append(child)
+        distances, previous, _ = _repair(self.in_edges, self.out_edges, tree.dist, affected)
+        for vertex in affected:
+            tree.dist[vertex] = distances[vertex]
+            tree.previous[vertex] = previous[vertex]
+
+    def _pairs_decrease(self, pairs, u, v, weight):
+        via = pairs.dist[:, u, None] + weight + pairs.dist[None, v, :]
+        better = via < pairs.dist
+        if better.any():
+            hop = pairs.next_hop[:, u].copy()
+            hop[u] = v
+            np.copyto(pairs.dist, via, where=better)
+            np.copyto(pairs.next_hop, np.broadcast_to(hop[:, None], better.shape), where=better)
+
+    def _pairs_increase(self, pairs, u, v, old):
+        # Pairs that had a shortest path through the edge; the slack only
+        # makes the set larger, which costs time but not correctness.
+        via = pairs.dist[:, u, None] + old + pairs.dist[None, v, :]
+        candidates = (via <= pairs.dist + 1e-9 * pairs.dist) & np.isfinite(pairs.dist)
+        np.fill_diagonal(candidates, False)
+        for source in np.flatnonzero(candidates.any(axis=1)).tolist():
+            affected = set(np.flatnonzero(candidates[source]).tolist())
+            row = pairs.dist[source].tolist()
+            distances, previous, order = _repair(self.in_edges, self.out_edges, row, affected)
+            hops = pairs.next_hop[source]
+            for vertex in affected:
+                pairs.dist[source, vertex] = distances[vertex]
+                hops[vertex] = -1
+            for vertex in order:
+                parent = previous[vertex]
+                hops[vertex] = vertex if parent == source else hops[parent]
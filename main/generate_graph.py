@@ -2,13 +2,27 @@
 Functions for generating graphs.
 """
 
+import math
 import random
 import string
+from array import array
 
-def generate_random_graph() -> dict[str, list[tuple[str, int]]]:
+import numpy as np
+
+from graph_utils import csr_from_numpy, grid_edges
+
+def generate_random_graph(num_vertices: int | None = None, num_edges: int | None = None,
+                          seed: int | None = None) -> dict[str, list[tuple[str, int]]]:
     """
     Generates a random graph.
 
+    Args:
+        num_vertices (int | None): Number of vertices; random between 10 and 100 if None.
+        num_edges (int | None): Number of edges; random between 50 and 150 if None.
+            It is capped at the number of possible edges.
+        seed (int | None): Seed for a private random generator, so equal seeds
+            give equal graphs.
+
     Returns:
         dict: A dictionary representation of the graph where keys are vertex names (str),
               and values are lists of tuples. Each tuple represents an edge and consists
@@ -22,14 +36,16 @@ def generate_random_graph() -> dict[str, list[tuple[str, int]]]:
         }
 
     The graph is randomly generated with the following properties:
-    - The number of vertices is chosen randomly between 10 and 100.
+    - Unless given, the number of vertices is chosen randomly between 10 and 100.
     - Vertices are labeled with unique alphabetic names ('a', 'b', ..., 'z', 'aa', 'ab', ..., etc.).
-    - The number of edges is chosen randomly, between 50 and a reasonable maximum based on the
-      total number of possible edges.
+    - Unless given, the number of edges is chosen randomly, between 50 and a reasonable
+      maximum based on the total number of possible edges.
     - Each edge has a randomly assigned weight between 1 and 10.
     - The graph is undirected, meaning that for every edge (u, v), both u -> v and v -> u are stored.
     """
-    num_vertices = random.randint(10, 100)
+    rng = random.Random(seed)
+    if num_vertices is None:
+        num_vertices = rng.randint(10, 100)
 
     def generate_vertex_names(n):
         """
@@ -56,16 +72,201 @@ def generate_random_graph() -> dict[str, list[tuple[str, int]]]:
     vertices = generate_vertex_names(num_vertices)
 
     max_edges = num_vertices * (num_vertices - 1) // 2
-    num_edges = random.randint(50, min(150, max_edges))
+    if num_edges is None:
+        num_edges = rng.randint(min(50, max_edges), min(150, max_edges))
+    num_edges = min(num_edges, max_edges)
 
     possible_edges = [(u, v) for idx, u in enumerate(vertices) for v in vertices[idx+1:]]
 
-    selected_edges = random.sample(possible_edges, num_edges)
+    selected_edges = rng.sample(possible_edges, num_edges)
 
     graph = {vertex: [] for vertex in vertices}
     for u, v in selected_edges:
-        weight = random.randint(1, 10)
+        weight = rng.randint(1, 10)
         graph[u].append((v, weight))
         graph[v].append((u, weight))
 
     return graph
+
+
+def _output(num_vertices, sources, targets, weights, directed, output, coords=None):
+    """
+    Turn NumPy edge arrays over ids 0..num_vertices-1 into the requested form.
+
+    Args:
+        sources, targets, weights (np.ndarray): One entry per edge; an undirected
+            edge is listed once.
+        output (str): 'csr' for a CSRGraph, 'edge_list' for a list of (a, b, weight)
+            tuples, 'dict' for the form of graph_utils.build_graph.
+        coords (np.ndarray | None): (num_vertices, 2) positions, kept by 'csr' only.
+    """
+    if output == 'edge_list':
+        return list(zip(sources.tolist(), targets.tolist(), weights.tolist()))
+    if output == 'dict':
+        graph = {vertex: [] for vertex in range(num_vertices)}
+        for a, b, weight in zip(sources.tolist(), targets.tolist(), weights.tolist()):
+            graph[a].append((b, weight))
+            if not directed:
+                graph[b].append((a, weight))
+        return graph
+    if output != 'csr':
+        raise ValueError(f"Unknown output: {output}")
+    if not directed:
+        # Both directions, interleaved per edge like build_graph.
+        sources, targets = (np.column_stack((sources, targets)).ravel(),
+                            np.column_stack((targets, sources)).ravel())
+        weights = np.repeat(weights, 2)
+    graph = csr_from_numpy(list(range(num_vertices)), sources, targets, weights, directed)
+    if coords is not None:
+        graph.coords = array('d', np.ascontiguousarray(coords, dtype=np.float64).ravel().tobytes())
+    return graph
+
+
+def _random_weights(rng, count, max_weight):
+    return rng.integers(1, max_weight + 1, size=count, dtype=np.int64)
+
+
+def gnm_random_graph(num_vertices, num_edges, seed=None, directed=False, max_weight=10,
+                     output='csr'):
+    """
+    Erdős–Rényi G(n, m) graph: num_edges distinct edges chosen uniformly
+    among all vertex pairs, without self-loops.
+
+    Edges are drawn as indices into the implicit list of pairs, so the
+    O(V²) list of possible edges is never built.
+
+    Args:
+        num_vertices (int): Number of vertices, labelled 0..num_vertices-1.
+        num_edges (int): Number of edges, capped at the number of possible pairs.
+        seed (int | None): Seed; equal seeds give equal graphs.
+        directed (bool): Whether (u, v) and (v, u) are different edges.
+        max_weight (int): Weights are random integers from 1 to max_weight.
+        output (str): 'csr', 'edge_list' or 'dict'.
+
+    >>> edges = gnm_random_graph(5, 4, seed=1, output='edge_list')
+    >>> len(edges), len({frozenset((a, b)) for a, b, _ in edges}), all(a != b for a, b, _ in edges)
+    (4, 4, True)
+    >>> gnm_random_graph(1000, 3000, seed=1).num_edges
+    6000
+    """
+    rng = np.random.default_rng(seed)
+    n = num_vertices
+    pairs = n * (n - 1) if directed else n * (n - 1) // 2
+    chosen = rng.choice(pairs, size=min(num_edges, pairs), replace=False).astype(np.int64)
+    if directed:
+        sources, targets = np.divmod(chosen, n - 1)
+        targets += targets >= sources
+    else:
+        # Pair index k -> (u, v), u < v, in row-major order of the upper
+        # triangle; the float estimate of u is corrected by one either way.
+        def row_start(u):
+            return u * (2 * n - u - 1) // 2
+        sources = (n - 2 - np.floor(np.sqrt(4.0 * n * (n - 1) - 8.0 * chosen - 7) / 2 - 0.5)).astype(np.int64)
+        sources -= row_start(sources) > chosen
+        sources += row_start(sources + 1) <= chosen
+        targets = chosen - row_start(sources) + sources + 1
+    weights = _random_weights(rng, len(chosen), max_weight)
+    return _output(n, sources, targets, weights, directed, output)
+
+
+def grid_graph(width, height, obstacle_ratio=0.0, diagonal=False, seed=None, output='csr'):
+    """
+    2D grid of cells; each cell is blocked with probability obstacle_ratio
+    and open cells are joined to their open 4-neighbours (8 with diagonal)
+    by edges of weight 1 (√2 for diagonal moves).
+
+    Cell (x, y) is vertex y * width + x and has coordinates (x, y). Blocked
+    cells are vertices without edges, so ids stay predictable.
+
+    >>> grid = grid_graph(3, 2)
+    >>> grid[0], grid.position(4)
+    ([(1, 1), (3, 1)], (1.0, 1.0))
+    """
+    rng = np.random.default_rng(seed)
+    open_cells = rng.random((height, width)) >= obstacle_ratio
+    sources, targets, weights = grid_edges(open_cells, diagonal)
+
+    ys, xs = np.divmod(np.arange(width * height), width)
+    return _output(width * height, sources, targets, weights, False, output,
+                   np.column_stack((xs, ys)))
+
+
+def random_geometric_graph(num_vertices, radius, seed=None, output='csr'):
+    """
+    Random geometric graph: points uniform in the unit square, joined when
+    they are at most radius apart, with the Euclidean distance as weight.
+
+    Points are bucketed into radius-sized cells, so only pairs in the same
+    or adjacent cells are compared.
+
+    >>> graph = random_geometric_graph(200, 0.1, seed=3)
+    >>> u, v, weight = next(graph.edges())
+    >>> (ux, uy), (vx, vy) = graph.position(u), graph.position(v)
+    >>> abs(math.hypot(ux - vx, uy - vy) - weight) < 1e-12 and weight <= 0.1
+    True
+    """
+    rng = np.random.default_rng(seed)
+    points = rng.random((num_vertices, 2))
+    cells_per_side = max(1, int(1 / radius))
+    cell = np.minimum((points * cells_per_side).astype(np.int64), cells_per_side - 1)
+    order = np.argsort(cell[:, 0] * cells_per_side + cell[:, 1], kind='stable')
+    cell_x, cell_y = cell[order, 0], cell[order, 1]
+    sorted_points = points[order]
+    bounds = np.searchsorted(cell_x * cells_per_side + cell_y,
+                             np.arange(cells_per_side ** 2 + 1))
+
+    sources, targets = [], []
+    # Half of the neighbourhood, so every pair of cells is seen once.
+    for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        x, y = cell_x + dx, cell_y + dy
+        inside = (x < cells_per_side) & (y >= 0) & (y < cells_per_side)
+        key = np.where(inside, x * cells_per_side + y, 0)
+        first = bounds[key]
+        counts = np.where(inside, bounds[key + 1] - first, 0)
+        # Candidate pairs: every point against every point of its neighbour cell.
+        here = np.repeat(np.arange(num_vertices), counts)
+        there = (np.repeat(first - (np.cumsum(counts) - counts), counts)
+                 + np.arange(len(here)))
+        keep = np.einsum('ij,ij->i', sorted_points[here] - sorted_points[there],
+                         sorted_points[here] - sorted_points[there]) <= radius * radius
+        if dx == 0 and dy == 0:
+            keep &= here < there
+        sources.append(order[here[keep]])
+        targets.append(order[there[keep]])
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+    weights = np.hypot(*(points[sources] - points[targets]).T)
+    return _output(num_vertices, sources, targets, weights, False, output, points)
+
+
+def barabasi_albert_graph(num_vertices, edges_per_vertex, seed=None, max_weight=10,
+                          output='csr'):
+    """
+    Scale-free Barabási–Albert graph: every new vertex attaches to
+    edges_per_vertex distinct existing vertices chosen with probability
+    proportional to their degree.
+
+    >>> graph = barabasi_albert_graph(100, 2, seed=0)
+    >>> graph.num_edges, max(graph.degree(u) for u in range(100)) > 10
+    (392, True)
+    """
+    rng = random.Random(seed)
+    m = edges_per_vertex
+    sources = array('q')
+    targets = array('q')
+    # Every vertex appears here once per incident edge.
+    endpoints = []
+    chosen = list(range(m))
+    for vertex in range(m, num_vertices):
+        for target in chosen:
+            sources.append(vertex)
+            targets.append(target)
+        endpoints.extend(chosen)
+        endpoints.extend([vertex] * m)
+        picked = set()
+        while len(picked) < m:
+            picked.add(rng.choice(endpoints))
+        chosen = list(picked)
+    sources = np.frombuffer(sources, dtype=np.int64)
+    targets = np.frombuffer(targets, dtype=np.int64)
+    weights = _random_weights(np.random.default_rng(seed), len(sources), max_weight)
+    return _output(num_vertices, sources, targets, weights, False, output)
@@ -2,40 +2,303 @@
 Functions for working with files with graphs.
 """
 
+import math
+from array import array
 
-def read_graph_from_file(filename):
+import numpy as np
+
+from csr_graph import CSRGraph
+
+
+class LoadReport:
     """
-    read file and return edge_list
+    Counts of what the loader skipped, instead of one message per line.
+    `examples` keeps the first few offending (line number, line) pairs.
+    """
+
+    max_examples = 5
+
+    def __init__(self):
+        self.lines = 0
+        self.edges = 0
+        self.malformed = 0
+        self.bad_weights = 0
+        self.examples = []
+
+    def _note(self, line_number, line):
+        if len(self.examples) < self.max_examples:
+            self.examples.append((line_number, line))
+
+    def __bool__(self):
+        return bool(self.malformed or self.bad_weights)
 
+    def __str__(self):
+        return (f"Рядків: {self.lines}, ребер: {self.edges}, "
+                f"неправильний формат: {self.malformed}, неправильна вага: {self.bad_weights}")
+
+
+def iter_edge_batches(filename, batch_lines=65536, report=None, positions=None):
     """
-    edge_list = []
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            for line_number, line in enumerate(f, start=1):
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
+    Read an edge-list file in chunks of about batch_lines lines and yield
+    (sources, targets, weights) per chunk: two lists of node labels and a
+    float64 NumPy array. Weights of a whole chunk are parsed in one call;
+    only a chunk with a bad weight falls back to line-by-line parsing.
+    Malformed lines are counted in report (a LoadReport) and skipped.
+
+    Comment lines of the form `#pos label x y` give node coordinates; they
+    are stored in positions (a dict label -> (x, y)) when it is given.
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    report = report if report is not None else LoadReport()
+    line_number = 0
+    with open(filename, 'r', encoding='utf-8') as f:
+        while True:
+            lines = f.readlines(batch_lines * 16)
+            if not lines:
+                break
+            sources, targets, weight_strings, numbers = [], [], [], []
+            for line in lines:
+                line_number += 1
                 parts = line.split()
-                if len(parts) == 2:
-                    parts.append(1)
-                if len(parts) != 3:
-                    print(f"Неправильний формат рядка {line_number}: {line}")
+                if not parts or parts[0].startswith('#'):
+                    if positions is not None and parts[0] == '#pos' and len(parts) == 4:
+                        try:
+                            positions[parts[1]] = (float(parts[2]), float(parts[3]))
+                        except ValueError:
+                            report.malformed += 1
+                            report._note(line_number, line.strip())
                     continue
-                a, b, weight_str = parts
-                try:
-                    weight = float(weight_str)
-                except ValueError:
-                    print(f"Неправильна вага на рядку {line_number}: {weight_str}")
+                if len(parts) == 2:
+                    parts.append('1')
+                elif len(parts) != 3:
+                    report.malformed += 1
+                    report._note(line_number, line.strip())
                     continue
-                edge_list.append((a, b, weight))
+                sources.append(parts[0])
+                targets.append(parts[1])
+                weight_strings.append(parts[2])
+                numbers.append(line_number)
+            report.lines = line_number
+
+            try:
+                weights = np.array(weight_strings, dtype=np.float64)
+            except ValueError:
+                keep = []
+                for i, weight in enumerate(weight_strings):
+                    try:
+                        float(weight)
+                        keep.append(i)
+                    except ValueError:
+                        report.bad_weights += 1
+                        report._note(numbers[i], weight)
+                sources = [sources[i] for i in keep]
+                targets = [targets[i] for i in keep]
+                weights = np.array([weight_strings[i] for i in keep], dtype=np.float64)
+
+            report.edges += len(sources)
+            if sources:
+                yield sources, targets, weights
+
+
+def load_compact_graph(filename, directed=False, batch_lines=65536, report=None):
+    """
+    Stream an edge-list file straight into a CSRGraph. Labels are given
+    ids as they are read and only id and weight arrays are kept, so no
+    list of edge tuples is ever built. `#pos` lines become the graph's
+    coords (NaN for nodes without a position).
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    index = {}
+    intern = index.setdefault
+    positions = {}
+    chunks_ids, chunks_weights = [], []
+    for sources, targets, weights in iter_edge_batches(filename, batch_lines, report, positions):
+        # Ids are handed out in (a, b) order per edge, like CSRGraph.from_edge_list.
+        ids = [intern(label, len(index)) for pair in zip(sources, targets) for label in pair]
+        chunks_ids.append(np.array(ids, dtype=np.int32))
+        chunks_weights.append(weights)
+
+    ends = np.concatenate(chunks_ids) if chunks_ids else np.empty(0, dtype=np.int32)
+    weights = np.concatenate(chunks_weights) if chunks_weights else np.empty(0)
+    if directed:
+        sources, targets = ends[0::2], ends[1::2]
+    else:
+        # Interleave a->b and b->a per edge, the order build_graph uses.
+        sources, targets = ends, ends.reshape(-1, 2)[:, ::-1].ravel()
+        weights = np.repeat(weights, 2)
+    graph = csr_from_numpy(list(index), sources, targets, weights, directed)
+    if positions:
+        coords = array('d', [float('nan')]) * (2 * len(graph))
+        for label, (x, y) in positions.items():
+            if label in graph.index:
+                u = graph.index[label]
+                coords[2 * u], coords[2 * u + 1] = x, y
+        graph.coords = coords
+    return graph
+
+
+def csr_from_numpy(labels, sources, targets, weights, directed):
+    """
+    Build a CSRGraph from NumPy edge arrays with a stable sort by source.
+    """
+    order = np.argsort(sources, kind='stable')
+    counts = np.bincount(sources, minlength=len(labels))
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    graph_offsets = array('q')
+    graph_offsets.frombytes(offsets.astype(np.int64).tobytes())
+    graph_targets = array('i')
+    graph_targets.frombytes(targets[order].astype(np.int32).tobytes())
+    # Integer weights stay integers, as in CSRGraph.from_edge_list.
+    integral = weights.dtype.kind in 'iu'
+    graph_weights = array('q' if integral else 'd')
+    graph_weights.frombytes(weights[order].astype(np.int64 if integral else np.float64).tobytes())
+    return CSRGraph(labels, graph_offsets, graph_targets, graph_weights, directed)
+
+
+def read_positions(filename):
+    """
+    Node coordinates from the `#pos label x y` lines of an edge-list file,
+    as a dict label -> (x, y).
+    """
+    positions = {}
+    for _ in iter_edge_batches(filename, positions=positions):
+        pass
+    return positions
+
+
+# Cells of a grid map that can be walked on: '.' and 'G' are ground and
+# 'S' is swamp in the MovingAI .map format; '@', 'O', 'T', 'W' and any
+# other character are blocked.
+GRID_OPEN = '.GS'
+GRID_SUFFIX = '.map'
+
+
+def read_grid_map(filename):
+    """
+    Read an occupancy grid as a (height, width) NumPy bool array, True for
+    open cells. The file is either a MovingAI .map file (a `type`,
+    `height`, `width`, `map` header and then one line per row) or just
+    the rows. Short rows are padded with blocked cells.
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    if lines and lines[0].split()[:1] == ['type']:
+        header = next((i for i, line in enumerate(lines) if line.strip() == 'map'), len(lines))
+        lines = lines[header + 1:]
+    rows = [line.rstrip() for line in lines]
+    while rows and not rows[-1]:
+        rows.pop()
+    width = max((len(row) for row in rows), default=0)
+    table = np.zeros(256, dtype=bool)
+    table[[ord(c) for c in GRID_OPEN]] = True
+    text = ''.join(row.ljust(width, '@') for row in rows).encode('ascii', 'replace')
+    return table[np.frombuffer(text, dtype=np.uint8)].reshape(len(rows), width)
+
+
+def grid_edges(open_cells, diagonal=False):
+    """
+    Edges between neighbouring open cells of a (height, width) bool array,
+    each listed once: NumPy arrays (sources, targets, weights) over cell ids
+    y * width + x. Moves cost 1, diagonal ones √2 and are not allowed to
+    cut the corner of a blocked cell. Weights are int64 without diagonals.
+    """
+    height, width = open_cells.shape
+    ids = np.arange(width * height, dtype=np.int64).reshape(height, width)
+    moves = [(1, 0, 1), (0, 1, 1)]
+    if diagonal:
+        moves += [(1, 1, math.sqrt(2)), (-1, 1, math.sqrt(2))]
+
+    sources, targets, weights = [], [], []
+    for dx, dy, weight in moves:
+        x_from, x_to = max(0, -dx), width - max(0, dx)
+        a = (slice(0, height - dy), slice(x_from, x_to))
+        b = (slice(dy, height), slice(x_from + dx, x_to + dx))
+        both = open_cells[a] & open_cells[b]
+        if diagonal and dx and dy:
+            # No cutting corners past blocked cells.
+            both &= open_cells[a[0], slice(x_from + dx, x_to + dx)] & open_cells[b[0], a[1]]
+        sources.append(ids[a][both])
+        targets.append(ids[b][both])
+        weights.append(np.full(int(both.sum()), weight))
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+    weights = np.concatenate(weights)
+    if not diagonal:
+        weights = weights.astype(np.int64)
+    return sources, targets, weights
+
+
+def grid_to_graph(open_cells, diagonal=True):
+    """
+    Undirected CSRGraph of a grid map. Cell (x, y) is node id
+    y * width + x with label "x,y" and coordinates (x, y); blocked cells
+    are nodes without edges.
+
+    >>> graph = grid_to_graph(np.array([[True, True], [False, True]]))
+    >>> graph['0,0'], graph.position(graph.index['1,1'])
+    ([('1,0', 1.0)], (1.0, 1.0))
+    """
+    height, width = open_cells.shape
+    sources, targets, weights = grid_edges(open_cells, diagonal)
+    # Both directions, interleaved per edge like build_graph.
+    sources, targets = (np.column_stack((sources, targets)).ravel(),
+                        np.column_stack((targets, sources)).ravel())
+    labels = [f"{x},{y}" for y in range(height) for x in range(width)]
+    graph = csr_from_numpy(labels, sources, targets, np.repeat(weights, 2), False)
+    ys, xs = np.divmod(np.arange(width * height, dtype=np.float64), width)
+    graph.coords = array('d', np.column_stack((xs, ys)).ravel().tobytes())
+    return graph
+
+
+def load_grid_map(filename, diagonal=True):
+    """
+    Read a grid map file (see read_grid_map) into a CSRGraph (see
+    grid_to_graph).
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    return grid_to_graph(read_grid_map(filename), diagonal)
+
+
+def read_graph_from_file(filename, compact=False, directed=False):
+    """
+    read file and return edge_list
+
+    With compact=True the edges are streamed straight into a CSRGraph
+    (directed or not) instead of being returned as a list.
+    Skipped lines are reported once, as counts.
+    """
+    report = LoadReport()
+    try:
+        if compact:
+            graph = load_compact_graph(filename, directed, report=report)
+        else:
+            edge_list = []
+            for sources, targets, weights in iter_edge_batches(filename, report=report):
+                edge_list.extend(zip(sources, targets, weights.tolist()))
     except FileNotFoundError:
         print(f"Файл {filename} не знайдено.")
-    return edge_list
+        return CSRGraph.from_edge_list([], directed) if compact else []
+    if report:
+        print(f"Пропущено рядків у {filename}: {report}")
+    return graph if compact else edge_list
 
-def build_graph(edge_list, directed = False):
+def build_graph(edge_list, directed = False, compact=False):
     """
     convert edge_list to dict form
+
+    With compact=True a CSRGraph is returned instead of a dict.
+
+    >>> build_graph([('a', 'b', 1), ('b', 'c', 2)])
+    {'a': [('b', 1)], 'b': [('a', 1), ('c', 2)], 'c': [('b', 2)]}
+    >>> build_graph([('a', 'b', 1), ('b', 'c', 2)], compact=True)['b']
+    [('a', 1), ('c', 2)]
     """
+    if compact:
+        return CSRGraph.from_edge_list(edge_list, directed)
     graph = {}
     for a, b, weight in edge_list:
         graph.setdefault(a, []).append((b, weight))
@@ -0,0 +1,246 @@
+"""
+Jump Point Search on uniform-cost grid maps.
+
+On an 8-connected grid (moves cost 1, diagonal moves √2 and may not cut
+the corner of a blocked cell) most shortest paths come in many symmetric
+copies that only differ in the order of the same moves, and A* expands
+all of them. JPS keeps one: from each cell it only continues in the
+directions a path through the parent could not have reached as cheaply,
+and instead of queueing every cell it jumps along a straight or diagonal
+line until it hits the goal, a wall, or a jump point, a cell with a
+neighbour that can only be reached optimally through it. Only jump
+points enter the A* queue, so open maps need orders of magnitude fewer
+expansions.
+
+The grid is read back from a CSRGraph built by graph_utils.grid_to_graph
+(or generate_graph.grid_graph with diagonal=True) and kept per graph as
+bytes with a border of blocked cells, so the jumps need no bounds checks.
+"""
+
+import weakref
+from heapq import heappop, heappush
+from math import sqrt
+
+import numpy as np
+
+from csr_graph import as_csr
+from graph_utils import grid_edges
+
+# Grid of each graph seen so far, dropped with the graph.
+_grids = weakref.WeakKeyDictionary()
+
+
+def grid_cells(graph):
+    """
+    (cells, width) of a grid map graph. cells holds 1 for every open cell
+    and 0 for blocked ones, row by row with a blocked border one cell
+    wide, so node id y * width + x is at (y + 1) * (width + 2) + x + 1.
+
+    Raises ValueError if graph is not an 8-connected grid map with node
+    ids in row-major order.
+
+    >>> from generate_graph import grid_graph
+    >>> cells, width = grid_cells(grid_graph(2, 1, diagonal=True))
+    >>> list(cells), width
+    ([0, 0, 0, 0, 0, 1, 1, 0, 0, 0, 0, 0], 2)
+    """
+    csr = as_csr(graph)
+    if csr in _grids:
+        return _grids[csr]
+    n = len(csr)
+    if csr.coords is None or not n:
+        raise ValueError("Jump Point Search needs a grid map with node coordinates")
+    coords = np.asarray(csr.coords, dtype=np.float64).reshape(n, 2)
+    width = int(np.nanmax(coords[:, 0])) + 1
+    height = n // width
+    ys, xs = np.divmod(np.arange(n), width)
+    if width * height != n or not np.array_equal(coords, np.column_stack((xs, ys))):
+        raise ValueError("Jump Point Search needs a grid map with node coordinates")
+
+    # The graph must have exactly the edges of an 8-connected grid over
+    # the cells that have any edges.
+    degrees = np.diff(np.asarray(csr.offsets, dtype=np.int64))
+    open_cells = (degrees > 0).reshape(height, width)
+    sources, targets, weights = grid_edges(open_cells, diagonal=True)
+    expected = np.concatenate((sources * n + targets, targets * n + sources))
+    expected_weights = np.concatenate((weights, weights))
+    actual = np.repeat(np.arange(n), degrees) * n + np.asarray(csr.targets, dtype=np.int64)
+    actual_weights = np.asarray(csr.weights, dtype=np.float64)
+    expected_order, actual_order = np.argsort(expected), np.argsort(actual)
+    if len(expected) != len(actual) \
+            or not np.array_equal(expected[expected_order], actual[actual_order]) \
+            or not np.allclose(expected_weights[expected_order], actual_weights[actual_order]):
+        raise ValueError("Jump Point Search needs an 8-connected grid map with weights 1 and √2")
+
+    padded = np.zeros((height + 2, width + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1] = open_cells
+    _grids[csr] = padded.tobytes(), width
+    return _grids[csr]
+
+
+def _jump_straight(cells, i, step, side, goal):
+    """
+    Walk from cell i by step until the goal or a cell with a forced
+    neighbour (returned) or a wall (-1). side is the perpendicular step.
+    """
+    while cells[i]:
+        # A neighbour on either side is forced when the cell behind it is
+        # blocked: the diagonal from the previous cell may not cut past.
+        if i == goal or (cells[i + side] and not cells[i - step + side]) \
+                or (cells[i - side] and not cells[i - step - side]):
+            return i
+        i += step
+    return -1
+
+
+def _jump(cells, stride, i, dx, dy, goal):
+    """
+    Next jump point from cell i, entered moving (dx, dy), or -1.
+    """
+    if not (dx and dy):
+        return _jump_straight(cells, i, dx + dy * stride, stride if dx else 1, goal)
+    vertical = dy * stride
+    while cells[i]:
+        # Diagonal moves have no forced neighbours without corner cutting;
+        # a cell is a jump point when one of its straight jumps finds one.
+        if i == goal or _jump_straight(cells, i + dx, dx, stride, goal) >= 0 \
+                or _jump_straight(cells, i + vertical, vertical, 1, goal) >= 0:
+            return i
+        if not (cells[i + dx] and cells[i + vertical]):
+            return -1
+        i += dx + vertical
+    return -1
+
+
+def _directions(cells, stride, i, dx, dy):
+    """
+    Directions worth jumping in from cell i, reached moving (dx, dy);
+    every direction for the start, where dx = dy = 0.
+    """
+    if dx and dy:
+        across, down = cells[i + dx], cells[i + dy * stride]
+        moves = ((dx, 0), across), ((0, dy), down), ((dx, dy), across and down)
+        return [move for move, ok in moves if ok]
+    if dx or dy:
+        ahead = cells[i + dx + dy * stride]
+        # The two sides of the move; diagonals need the side and ahead open.
+        sides = ((0, -1), (0, 1)) if dx else ((-1, 0), (1, 0))
+        moves = [(dx, dy)] if ahead else []
+        for sx, sy in sides:
+            if cells[i + sx + sy * stride]:
+                moves.append((sx, sy))
+                if ahead:
+                    moves.append((dx + sx, dy + sy))
+        return moves
+    moves = []
+    for mx, my in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        if cells[i + mx + my * stride]:
+            moves.append((mx, my))
+    for mx, my in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+        if cells[i + mx] and cells[i + my * stride]:
+            moves.append((mx, my))
+    return moves
+
+
+def jump_point_search(graph, start, goal, stats=None):
+    """
+    param graph: CSRGraph of an 8-connected grid map, see grid_cells
+
+    param start: The starting node
+
+    param goal: The goal node
+
+    param stats: optional instrumentation.SearchStats; expanded counts
+    jump points and relaxed the directions jumped in
+
+    returns shortest path with every cell on it, presented in a
+    tuple (path: list of nodes, weight)
+
+    >>> from algorithms import astar
+    >>> from graph_utils import grid_to_graph
+    >>> from instrumentation import SearchStats
+    >>> graph = grid_to_graph(np.ones((20, 20), dtype=bool))
+    >>> stats = SearchStats()
+    >>> path, weight = jump_point_search(graph, '0,0', '19,10', stats)
+    >>> path[:3], path[-1], len(path), round(weight, 6), stats.expanded
+    (['0,0', '1,1', '2,2'], '19,10', 20, 23.142136, 2)
+    >>> stats = SearchStats()
+    >>> round(astar(graph, '0,0', '19,10', heuristic='octile', stats=stats)[1], 6), stats.expanded
+    (23.142136, 109)
+    """
+    csr = as_csr(graph)
+    if start not in csr.index or goal not in csr.index:
+        return None, float('infinity')
+    if start == goal:
+        return [start], 0
+    cells, width = grid_cells(csr)
+    stride = width + 2
+    start_cell, goal_cell = ((u // width + 1) * stride + u % width + 1
+                             for u in (csr.index[start], csr.index[goal]))
+    if not cells[start_cell] or not cells[goal_cell]:
+        return None, float('infinity')
+
+    diagonal = sqrt(2) - 1
+    goal_y, goal_x = divmod(goal_cell, stride)
+
+    def octile(y, x, to_y, to_x):
+        dx, dy = abs(x - to_x), abs(y - to_y)
+        return max(dx, dy) + diagonal * min(dx, dy)
+
+    distances = {start_cell: 0.0}
+    parents = {start_cell: None}
+    closed = set()
+    heap = [(octile(*divmod(start_cell, stride), goal_y, goal_x), start_cell)]
+    if stats is not None:
+        stats.pushes += 1
+
+    while heap:
+        _, current = heappop(heap)
+        if stats is not None:
+            stats.pop(len(heap))
+        if current in closed:
+            continue
+        if current == goal_cell:
+            return _cell_path(csr, parents, current, stride, width), distances[current]
+        closed.add(current)
+
+        y, x = divmod(current, stride)
+        parent = parents[current]
+        dx = dy = 0
+        if parent is not None:
+            parent_y, parent_x = divmod(parent, stride)
+            dx, dy = (x > parent_x) - (x < parent_x), (y > parent_y) - (y < parent_y)
+        moves = _directions(cells, stride, current, dx, dy)
+        for move_x, move_y in moves:
+            jump = _jump(cells, stride, current + move_x + move_y * stride, move_x, move_y,
+                         goal_cell)
+            if jump < 0 or jump in closed:
+                continue
+            jump_y, jump_x = divmod(jump, stride)
+            distance = distances[current] + octile(y, x, jump_y, jump_x)
+            if distance < distances.get(jump, float('infinity')):
+                distances[jump] = distance
+                parents[jump] = current
+                heappush(heap, (distance + octile(jump_y, jump_x, goal_y, goal_x), jump))
+
+        if stats is not None:
+            stats.expand(len(moves), len(heap))
+
+    return None, float('infinity')
+
+
+def _cell_path(csr, parents, goal, stride, width):
+    """
+    Labels of every cell from the start to goal, filling in the straight
+    and diagonal runs between consecutive jump points.
+    """
+    jumps = [goal]
+    while parents[jumps[-1]] is not None:
+        jumps.append(parents[jumps[-1]])
+    jumps.reverse()
+    cells = [jumps[0]]
+    for a, b in zip(jumps, jumps[1:]):
+        (a_y, a_x), (b_y, b_x) = divmod(a, stride), divmod(b, stride)
+        step = (b_x > a_x) - (b_x < a_x) + ((b_y > a_y) - (b_y < a_y)) * stride
+        cells.extend(range(a + step, b + step, step))
+    return [csr.labels[(i // stride - 1) * width + i % stride - 1] for i in cells]
@@ -0,0 +1,201 @@
+"""
+Addressable priority queues over integer items 0..n-1.
+
+Both queues support push, pop of the minimum, and decrease-key on an item
+that is already queued, which is what Dijkstra needs to keep a single
+entry per vertex instead of relying on lazy deletion.
+"""
+
+
+class DaryHeap:
+    """
+    Implicit d-ary min-heap with a position table for decrease-key.
+
+    >>> heap = DaryHeap(5)
+    >>> heap.push(7, 0); heap.push(3, 1); heap.push(5, 2)
+    >>> heap.decrease(0, 1)
+    >>> [heap.pop() for _ in range(len(heap))]
+    [(1, 0), (3, 1), (5, 2)]
+    """
+
+    def __init__(self, size, arity=4):
+        self.arity = arity
+        self.keys = []
+        self.items = []
+        self.position = [-1] * size
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return self.position[item] >= 0
+
+    def push(self, key, item):
+        """
+        Insert item with the given key.
+        """
+        self.keys.append(key)
+        self.items.append(item)
+        self._sift_up(len(self.items) - 1)
+
+    def decrease(self, item, key):
+        """
+        Lower the key of a queued item.
+        """
+        index = self.position[item]
+        self.keys[index] = key
+        self._sift_up(index)
+
+    def pop(self):
+        """
+        Remove and return (key, item) with the smallest key.
+        """
+        keys, items = self.keys, self.items
+        key, item = keys[0], items[0]
+        self.position[item] = -1
+        last_key, last_item = keys.pop(), items.pop()
+        if items:
+            keys[0], items[0] = last_key, last_item
+            self._sift_down(0)
+        return key, item
+
+    def _sift_up(self, index):
+        keys, items, position, arity = self.keys, self.items, self.position, self.arity
+        key, item = keys[index], items[index]
+        while index > 0:
+            parent = (index - 1) // arity
+            if keys[parent] <= key:
+                break
+            keys[index], items[index] = keys[parent], items[parent]
+            position[items[index]] = index
+            index = parent
+        keys[index], items[index] = key, item
+        position[item] = index
+
+    def _sift_down(self, index):
+        keys, items, position, arity = self.keys, self.items, self.position, self.arity
+        size = len(items)
+        key, item = keys[index], items[index]
+        while True:
+            first = index * arity + 1
+            if first >= size:
+                break
+            last = min(first + arity, size)
+            child = first
+            for i in range(first + 1, last):
+                if keys[i] < keys[child]:
+                    child = i
+            if keys[child] >= key:
+                break
+            keys[index], items[index] = keys[child], items[child]
+            position[items[index]] = index
+            index = child
+        keys[index], items[index] = key, item
+        position[item] = index
+
+
+class _PairingNode:
+    __slots__ = ('key', 'item', 'child', 'sibling', 'prev')
+
+    def __init__(self, key, item):
+        self.key = key
+        self.item = item
+        self.child = None
+        self.sibling = None
+        self.prev = None
+
+
+class PairingHeap:
+    """
+    Pairing heap with two-pass pairing on delete-min and O(1) decrease-key.
+
+    >>> heap = PairingHeap(5)
+    >>> heap.push(7, 0); heap.push(3, 1); heap.push(5, 2)
+    >>> heap.decrease(0, 1)
+    >>> [heap.pop() for _ in range(len(heap))]
+    [(1, 0), (3, 1), (5, 2)]
+    """
+
+    def __init__(self, size):
+        self.root = None
+        self.nodes = [None] * size
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, item):
+        return self.nodes[item] is not None
+
+    @staticmethod
+    def _meld(a, b):
+        if b is None:
+            return a
+        if a is None:
+            return b
+        if b.key < a.key:
+            a, b = b, a
+        b.prev = a
+        b.sibling = a.child
+        if a.child is not None:
+            a.child.prev = b
+        a.child = b
+        a.sibling = None
+        return a
+
+    def push(self, key, item):
+        """
+        Insert item with the given key.
+        """
+        node = _PairingNode(key, item)
+        self.nodes[item] = node
+        self.root = self._meld(self.root, node)
+        self.size += 1
+
+    def decrease(self, item, key):
+        """
+        Lower the key of a queued item.
+        """
+        node = self.nodes[item]
+        node.key = key
+        if node is self.root:
+            return
+        if node.prev.child is node:
+            node.prev.child = node.sibling
+        else:
+            node.prev.sibling = node.sibling
+        if node.sibling is not None:
+            node.sibling.prev = node.prev
+        node.sibling = node.prev = None
+        self.root = self._meld(self.root, node)
+
+    def pop(self):
+        """
+        Remove and return (key, item) with the smallest key.
+        """
+        root = self.root
+        self.nodes[root.item] = None
+        self.size -= 1
+
+        pairs = []
+        child = root.child
+        while child is not None:
+            first = child
+            second = child.sibling
+            child = second.sibling if second is not None else None
+            first.sibling = first.prev = None
+            if second is not None:
+                second.sibling = second.prev = None
+            pairs.append(self._meld(first, second))
+
+        merged = None
+        for tree in reversed(pairs):
+            merged = self._meld(tree, merged)
+        self.root = merged
+        return root.key, root.item
+
+
+HEAPS = {
+    'dary': DaryHeap,
+    'pairing': PairingHeap,
+}
@@ -0,0 +1,97 @@
+"""
+Counters that explain where a search spends its time.
+
+Every algorithm in algorithms.py takes an optional stats argument. Left
+at None, the searches only pay for an `is not None` test per queue pop;
+given a SearchStats they count their work into it:
+
+    expanded        vertices whose out-edges were scanned
+    relaxed         edges scanned (relaxation attempts)
+    pushes, pops    priority queue (or stack/deque) operations; pops
+                    include stale heap entries that are skipped
+    peak_frontier   largest number of queued entries at any time
+
+Searches add to the counters, so one SearchStats can collect a whole
+batch of queries.
+"""
+
+import tracemalloc
+
+
+class SearchStats:
+    """
+    Work counters of one or more searches.
+
+    >>> from algorithms import dijkstra
+    >>> stats = SearchStats()
+    >>> dijkstra({'A': [('B', 1), ('C', 4)], 'B': [('C', 1)], 'C': []}, 'A', 'C', stats=stats)
+    (['A', 'B', 'C'], 2)
+    >>> stats.as_dict()
+    {'expanded': 2, 'relaxed': 3, 'pushes': 4, 'pops': 3, 'peak_frontier': 2, 'peak_memory': None}
+    """
+
+    __slots__ = ('expanded', 'relaxed', 'pushes', 'pops', 'peak_frontier', 'peak_memory',
+                 '_size')
+
+    FIELDS = ('expanded', 'relaxed', 'pushes', 'pops', 'peak_frontier', 'peak_memory')
+
+    def __init__(self):
+        self.expanded = 0
+        self.relaxed = 0
+        self.pushes = 0
+        self.pops = 0
+        self.peak_frontier = 0
+        self.peak_memory = None
+        self._size = 0
+
+    def pop(self, frontier):
+        """
+        Record a pop that left frontier entries queued.
+        """
+        self.pops += 1
+        self._size = frontier
+        if frontier + 1 > self.peak_frontier:
+            self.peak_frontier = frontier + 1
+
+    def expand(self, edges, frontier):
+        """
+        Record the expansion of the vertex popped last: edges were scanned
+        and the queue grew from its size after the pop to frontier.
+        """
+        self.expanded += 1
+        self.relaxed += edges
+        self.pushes += frontier - self._size
+        if frontier > self.peak_frontier:
+            self.peak_frontier = frontier
+
+    def as_dict(self):
+        """
+        The counters as a dict, in FIELDS order.
+        """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        return 'SearchStats(' + ', '.join(f"{k}={v}" for k, v in self.as_dict().items()) + ')'
+
+
+def profile_algorithm(algorithm, graph, start, goal, **kwargs):
+    """
+    Run algorithm once with a fresh SearchStats and tracemalloc, and
+    return (result, stats) with stats.peak_memory in bytes.
+
+    tracemalloc slows Python code down considerably, so take timings from
+    a separate run.
+    """
+    stats = SearchStats()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        result = algorithm(graph, start, goal, stats=stats, **kwargs)
+        stats.peak_memory = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if started:
+            tracemalloc.stop()
+    return result, stats
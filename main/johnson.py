@@ -0,0 +1,188 @@
+"""
+Johnson's algorithm: all-pairs shortest paths for sparse graphs that may
+have negative edge weights.
+
+One SPFA pass from a virtual vertex joined to every vertex by a 0-weight
+edge gives potentials h with w(u, v) + h(u) - h(v) >= 0 on every edge.
+Dijkstra then runs from every source on the reweighted graph, which costs
+O(V E log V) in total instead of Floyd-Warshall's O(V^3). The per-source
+searches are spread over a process pool: the reweighted graph is shared
+as in batch.py, and workers write their rows straight into shared result
+matrices.
+"""
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from algorithms import _dijkstra_search, _spfa_search
+from all_pairs import AllPairs
+from batch import _open_shared, _share
+from csr_graph import CSRGraph, as_csr
+
+# Per-worker state, set by _attach.
+_blocks = None
+_graph = None
+_potential = None
+_dist = None
+_next_hop = None
+_heap = None
+
+
+def potentials(csr):
+    """
+    Johnson potentials of a CSRGraph as a float64 array: shortest
+    distances from a virtual vertex with a 0-weight edge to every vertex.
+    All zeros when no weight is negative.
+
+    Raises NegativeCycleError if the graph has a negative cycle.
+    """
+    n = len(csr)
+    weights = np.asarray(csr.weights, dtype=np.float64)
+    if not len(weights) or weights.min() >= 0:
+        return np.zeros(n)
+    # The virtual vertex gets id n; its edges go last, so the CSR arrays
+    # only need appending.
+    typecode = csr.weight_typecode
+    offsets = array('q', csr.offsets)
+    offsets.append(offsets[-1] + n)
+    targets = array('i', csr.targets)
+    targets.extend(range(n))
+    virtual_weights = array(typecode, csr.weights)
+    virtual_weights.extend(array(typecode, [0]) * n)
+    augmented = CSRGraph(csr.labels + [None], offsets, targets, virtual_weights, True)
+    distances, _ = _spfa_search(augmented, n)
+    return np.array(distances[:n], dtype=np.float64)
+
+
+def _reweighted(csr, potential):
+    """
+    csr with every weight w(u, v) replaced by w(u, v) + h(u) - h(v).
+    """
+    offsets = np.asarray(csr.offsets, dtype=np.int64)
+    sources = np.repeat(np.arange(len(csr)), np.diff(offsets))
+    targets = np.asarray(csr.targets, dtype=np.int64)
+    weights = np.asarray(csr.weights, dtype=np.float64) + potential[sources] - potential[targets]
+    if csr.weight_typecode == 'q':
+        weights = array('q', weights.astype(np.int64).tobytes())
+    else:
+        # Rounding may leave -1e-16 where the exact value is 0.
+        weights = array('d', np.maximum(weights, 0).tobytes())
+    return CSRGraph(csr.labels, csr.offsets, csr.targets, weights, csr.directed)
+
+
+def _fill_rows(graph, potential, sources, dist, next_hop, heap='auto'):
+    """
+    Dijkstra from every id in sources on the reweighted graph, writing the
+    real distances and next hops into rows of dist and next_hop.
+    """
+    n = len(graph)
+    ids = np.arange(n)
+    for source in sources:
+        with graph.search_state() as state:
+            distances, previous = _dijkstra_search(graph, source, None, heap, state=state)
+            row = np.array(distances, dtype=np.float64)
+            # None becomes NaN, which marks unreached vertices.
+            parent = np.array(previous, dtype=np.float64)
+        reached = np.isfinite(row)
+        dist[source] = row + potential - potential[source]
+
+        # Pointer doubling up the shortest path tree: every vertex ends at
+        # its ancestor that is a child of source, which is the next hop.
+        parent[source] = source
+        jump = np.where(reached, parent, ids).astype(np.int64)
+        jump = np.where(jump == source, ids, jump)
+        while True:
+            further = jump[jump]
+            if np.array_equal(further, jump):
+                break
+            jump = further
+        next_hop[source] = np.where(reached, jump, -1)
+
+
+def _attach(graph_name, layout, labels, directed, potential, result_name, heap):
+    """
+    Worker initializer: map the shared graph and result matrices.
+    """
+    global _blocks, _graph, _potential, _dist, _next_hop, _heap
+    graph_block, result_block = _open_shared(graph_name), _open_shared(result_name)
+    _blocks = (graph_block, result_block)
+    offsets, targets, weights = (graph_block.buf[start:start + size].cast(typecode)
+                                 for typecode, start, size in layout)
+    _graph = CSRGraph(labels, offsets, targets, weights, directed)
+    _potential = potential
+    _dist, _next_hop = _result_views(result_block, len(labels))
+    _heap = heap
+
+
+def _result_views(block, n):
+    dist = np.ndarray((n, n), dtype=np.float64, buffer=block.buf)
+    next_hop = np.ndarray((n, n), dtype=np.int32, buffer=block.buf, offset=8 * n * n)
+    return dist, next_hop
+
+
+def _run_sources(sources):
+    _fill_rows(_graph, _potential, sources, _dist, _next_hop, _heap)
+    return len(sources)
+
+
+def johnson_matrix(graph, workers=None, chunk_size=16, heap='auto'):
+    """
+    All-pairs shortest paths with Johnson's algorithm.
+
+    param graph: dict or CSRGraph; weights may be negative
+
+    param workers: processes for the per-source Dijkstra runs,
+    os.cpu_count() by default; 1 runs them in this process
+
+    param chunk_size: sources per task
+
+    param heap: priority queue of the Dijkstra runs, see algorithms.dijkstra
+
+    returns all_pairs.AllPairs; raises NegativeCycleError if the graph
+    has a negative cycle
+
+    >>> graph = {'a': [('b', 4), ('c', 2)], 'b': [('d', -3)], 'c': [('b', 1)], 'd': []}
+    >>> pairs = johnson_matrix(graph, workers=1)
+    >>> pairs.path('a', 'd'), pairs.path('d', 'a')
+    ((['a', 'c', 'b', 'd'], 0), ([], inf))
+    >>> johnson_matrix(graph, workers=2).dist.tolist() == pairs.dist.tolist()
+    True
+    """
+    csr = as_csr(graph)
+    n = len(csr)
+    if n >= 2 ** 31:
+        raise ValueError("Too many vertices for an int32 next-hop matrix")
+    potential = potentials(csr)
+    reweighted = _reweighted(csr, potential)
+    integral = csr.weight_typecode == 'q'
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or n <= chunk_size:
+        dist = np.empty((n, n))
+        next_hop = np.empty((n, n), dtype=np.int32)
+        _fill_rows(reweighted, potential, range(n), dist, next_hop, heap)
+        return AllPairs(csr.labels, dist, next_hop, integral)
+
+    graph_block, layout = _share(reweighted)
+    result_block = shared_memory.SharedMemory(create=True, size=max(12 * n * n, 1))
+    try:
+        with ProcessPoolExecutor(workers, initializer=_attach,
+                                 initargs=(graph_block.name, layout, csr.labels, csr.directed,
+                                           potential, result_block.name, heap)) as pool:
+            chunks = [range(lo, min(lo + chunk_size, n)) for lo in range(0, n, chunk_size)]
+            for _ in pool.map(_run_sources, chunks):
+                pass
+        shared_dist, shared_next_hop = _result_views(result_block, n)
+        dist, next_hop = shared_dist.copy(), shared_next_hop.copy()
+        # The block cannot be closed while arrays still point into it.
+        del shared_dist, shared_next_hop
+    finally:
+        graph_block.close()
+        graph_block.unlink()
+        result_block.close()
+        result_block.unlink()
+    return AllPairs(csr.labels, dist, next_hop, integral)
@@ -0,0 +1,105 @@
+"""
+Landmark (ALT) lower bounds for A*.
+
+A handful of landmark vertices is chosen once per graph and the distances
+from and to each of them are stored. By the triangle inequality, for any
+landmark L
+
+    d(v, t) >= d(L, t) - d(L, v)    and    d(v, t) >= d(v, L) - d(t, L)
+
+so the largest of these differences is an admissible and consistent A*
+heuristic that costs O(k) per vertex instead of a search per query.
+Edge weights must be non-negative.
+"""
+
+from array import array
+
+from algorithms import _dijkstra_search
+from csr_graph import CSRGraph, as_csr
+
+
+class LandmarkIndex:
+    """
+    Distances from and to k landmarks of one graph.
+
+    >>> graph = {'A': [('B', 1)], 'B': [('C', 2)], 'C': [('D', 3)], 'D': []}
+    >>> index = LandmarkIndex(graph, count=2)
+    >>> [index.graph.labels[landmark] for landmark in index.landmarks]
+    ['A', 'D']
+    >>> bound = index.heuristic(index.graph.index['D'])
+    >>> bound(index.graph.index['A']), bound(index.graph.index['C'])
+    (6.0, 3.0)
+    """
+
+    def __init__(self, graph, count=8):
+        self.graph = as_csr(graph)
+        reverse_graph = self.graph.reverse()
+        self.landmarks = []
+        self.from_landmark = []
+        self.to_landmark = []
+
+        closest = [float('inf')] * len(self.graph)
+        candidate = 0
+        for _ in range(min(count, len(self.graph))):
+            self.landmarks.append(candidate)
+            from_distances = array('d', _dijkstra_search(self.graph, candidate)[0])
+            if reverse_graph is self.graph:
+                to_distances = from_distances
+            else:
+                to_distances = array('d', _dijkstra_search(reverse_graph, candidate)[0])
+            self.from_landmark.append(from_distances)
+            self.to_landmark.append(to_distances)
+
+            # Farthest-point selection: the next landmark is the vertex
+            # worst covered by the landmarks chosen so far. Vertices none
+            # of them reaches come first, so every component gets one.
+            for vertex, distance in enumerate(from_distances):
+                if distance < closest[vertex]:
+                    closest[vertex] = distance
+            chosen = set(self.landmarks)
+            candidate = max((vertex for vertex in range(len(self.graph)) if vertex not in chosen),
+                            key=closest.__getitem__, default=None)
+            if candidate is None:
+                break
+
+    def lower_bound(self, vertex, goal):
+        """
+        Lower bound on the distance from vertex to goal (node ids).
+        Infinity means goal is not reachable from vertex.
+        """
+        return self.heuristic(goal)(vertex)
+
+    def heuristic(self, goal):
+        """
+        Return h(vertex), the landmark lower bound towards goal (node id).
+        """
+        infinity = float('inf')
+        tables = [(from_l, from_l[goal], to_l, to_l[goal])
+                  for from_l, to_l in zip(self.from_landmark, self.to_landmark)]
+
+        def bound(vertex):
+            best = 0.0
+            for from_l, from_goal, to_l, to_goal in tables:
+                from_vertex, to_vertex = from_l[vertex], to_l[vertex]
+                if from_vertex != infinity:
+                    if from_goal == infinity:
+                        return infinity
+                    if from_goal - from_vertex > best:
+                        best = from_goal - from_vertex
+                if to_goal != infinity:
+                    if to_vertex == infinity:
+                        return infinity
+                    if to_vertex - to_goal > best:
+                        best = to_vertex - to_goal
+            return best
+
+        return bound
+
+    def graph_for(self, graph):
+        """
+        The CSRGraph the index was built for. A dict graph is taken to be
+        the one the index was built from; a different CSRGraph is an error.
+        """
+        if isinstance(graph, CSRGraph) and graph is not self.graph:
+            raise ValueError("Landmark index was built for a different graph")
+        return self.graph
@@ -28,6 +28,7 @@ def main():
 
     widgets['load_button'].config(command=lambda: app.load_graph(state, widgets))
     widgets['run_button'].config(command=lambda: app.run_algorithms(state, widgets))
+    widgets['cancel_button'].config(command=lambda: app.cancel_algorithms(state, widgets))
     widgets['generate_graph'].config(command=lambda:app.random_graph(state, widgets))
     widgets['visualize_button'].config(command=lambda: app.visualize(state))
     root.mainloop()
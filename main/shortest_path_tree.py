@@ -0,0 +1,117 @@
+"""
+Single-source and one-to-many shortest paths.
+
+Dijkstra, Bellman-Ford and SPFA all compute a whole tree of shortest paths
+from their start vertex. The functions here keep that tree, so any number
+of queries from the same origin cost one search.
+"""
+
+from algorithms import _bellman_ford_search, _dijkstra_search, _reconstruct_path, _spfa_search
+from csr_graph import as_csr
+
+
+class ShortestPathTree:
+    """
+    Distance and predecessor lists of one search, indexed by node id.
+
+    >>> graph = {'A': [('B', 1), ('C', 4)], 'B': [('C', 2)], 'C': [], 'D': []}
+    >>> tree = single_source(graph, 'A')
+    >>> tree.path('C'), tree.distance('B'), tree.path('D')
+    ((['A', 'B', 'C'], 3), 1, ([], inf))
+    >>> tree.distances()
+    {'A': 0, 'B': 1, 'C': 3}
+    """
+
+    def __init__(self, graph, source, distances, previous):
+        self.graph = graph
+        self.source = source
+        self.dist = distances
+        self.previous = previous
+
+    def distance(self, goal):
+        """
+        Shortest distance from the source to goal (label).
+        """
+        if goal not in self.graph.index:
+            return float('inf')
+        return self.dist[self.graph.index[goal]]
+
+    def path(self, goal):
+        """
+        Shortest path from the source to goal, returned as a
+        tuple (path: list of nodes, weight).
+        """
+        if goal not in self.graph.index:
+            return [], float('inf')
+        goal = self.graph.index[goal]
+        if self.dist[goal] == float('inf'):
+            return [], float('inf')
+        return self.graph.path_labels(_reconstruct_path(self.previous, self.source, goal)), \
+            self.dist[goal]
+
+    def distances(self):
+        """
+        Dict of label -> distance for every vertex reached.
+        """
+        labels = self.graph.labels
+        return {labels[vertex]: distance for vertex, distance in enumerate(self.dist)
+                if distance != float('inf')}
+
+
+def _empty_tree(csr):
+    return ShortestPathTree(csr, None, [float('inf')] * len(csr), [None] * len(csr))
+
+
+def single_source(graph, start, method='dijkstra', **options):
+    """
+    Shortest paths from start to every vertex.
+
+    param graph: dict or CSRGraph
+
+    param start: The starting node
+
+    param method: 'dijkstra' (non-negative weights; option heap=...),
+    'bellman_ford' or 'spfa' (options slf=..., lll=...)
+
+    returns ShortestPathTree; raises NegativeCycleError if method allows
+    negative weights and a negative cycle is reachable from start
+    """
+    csr = as_csr(graph)
+    if start not in csr.index:
+        return _empty_tree(csr)
+    source = csr.index[start]
+    if method == 'dijkstra':
+        distances, previous = _dijkstra_search(csr, source, **options)
+    elif method == 'bellman_ford':
+        distances, previous = _bellman_ford_search(csr, source)
+    elif method == 'spfa':
+        distances, previous = _spfa_search(csr, source, **options)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+    return ShortestPathTree(csr, source, distances, previous)
+
+
+def one_to_many(graph, start, goals, heap='auto'):
+    """
+    Dijkstra from start that stops once every goal is settled.
+
+    Distances and paths are exact for the goals (and every vertex closer
+    than the farthest goal); other vertices may hold tentative values.
+
+    returns ShortestPathTree
+
+    >>> graph = {'A': [('B', 1)], 'B': [('C', 1)], 'C': [('D', 1)], 'D': []}
+    >>> tree = one_to_many(graph, 'A', ['B', 'C', 'X'])
+    >>> [tree.path(goal) for goal in ['B', 'C', 'X']]
+    [(['A', 'B'], 1), (['A', 'B', 'C'], 2), ([], inf)]
+    >>> tree.distance('D')
+    inf
+    """
+    csr = as_csr(graph)
+    if start not in csr.index:
+        return _empty_tree(csr)
+    source = csr.index[start]
+    # With no known goal the search stops right after settling start.
+    targets = {csr.index[goal] for goal in goals if goal in csr.index} or {source}
+    distances, previous = _dijkstra_search(csr, source, targets, heap)
+    return ShortestPathTree(csr, source, distances, previous)
@@ -1,5 +1,7 @@
 "Time"
 
+import gc
+import statistics
 import time
 
 def time_algorithm(algorithm, graph, start, goal, **kwargs):
@@ -16,3 +18,65 @@ def time_algorithm(algorithm, graph, start, goal, **kwargs):
         return (path, total_weight, exec_time)
     else:
         return None
+
+
+def measure(function, warmup=1, repeat=5, disable_gc=True):
+    """
+    Call function() warmup times untimed, then repeat times timed.
+    With disable_gc the collector runs before every timed call and is
+    switched off during it, so collections do not land in one sample.
+
+    Returns the list of run times in seconds and the last result.
+    """
+    result = None
+    for _ in range(warmup):
+        result = function()
+    gc_was_enabled = gc.isenabled()
+    times = []
+    try:
+        for _ in range(repeat):
+            if disable_gc:
+                gc.collect()
+                gc.disable()
+            start_time = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start_time)
+            if disable_gc and gc_was_enabled:
+                gc.enable()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return times, result
+
+
+def percentile(sorted_times, fraction):
+    """
+    Linear-interpolated percentile of an already sorted list.
+
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 0.5)
+    2.5
+    """
+    position = (len(sorted_times) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_times) - 1)
+    return sorted_times[lower] + (sorted_times[upper] - sorted_times[lower]) * (position - lower)
+
+
+def summarize(times):
+    """
+    Statistics of a list of run times.
+
+    >>> summarize([3.0, 1.0, 2.0])['median']
+    2.0
+    """
+    ordered = sorted(times)
+    return {
+        'runs': len(ordered),
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'mean': statistics.fmean(ordered),
+        'p90': percentile(ordered, 0.9),
+        'p99': percentile(ordered, 0.99),
+        'max': ordered[-1],
+        'stdev': statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
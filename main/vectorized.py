@@ -0,0 +1,152 @@
+"""
+NumPy engines that relax a flat array of edges in bulk.
+"""
+
+import numpy as np
+
+from algorithms import NegativeCycleError
+from csr_graph import as_csr
+
+
+class EdgeArray:
+    """
+    All edges of a graph as parallel NumPy arrays, sorted by target so
+    that the best candidate distance of every vertex can be taken with a
+    single np.minimum.reduceat.
+
+    >>> edges = EdgeArray.from_graph({'a': [('b', 1), ('c', 4)], 'b': [('c', 2)], 'c': []})
+    >>> edges.sources.tolist(), edges.targets.tolist(), edges.weights.tolist()
+    ([0, 0, 1], [1, 2, 2], [1.0, 4.0, 2.0])
+    """
+
+    def __init__(self, labels, sources, targets, weights, integral=False):
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        order = np.argsort(targets, kind='stable')
+        self.sources = sources[order]
+        self.targets = targets[order]
+        self.weights = weights[order]
+        self.integral = integral
+        # First edge of every run of equal targets, for reduceat.
+        starts = np.flatnonzero(np.diff(self.targets, prepend=-1))
+        self.group_starts = starts
+        self.group_targets = self.targets[starts]
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Build from a dict or CSRGraph.
+        """
+        csr = as_csr(graph)
+        degrees = np.diff(np.asarray(csr.offsets, dtype=np.int64))
+        sources = np.repeat(np.arange(len(csr), dtype=np.int64), degrees)
+        targets = np.asarray(csr.targets, dtype=np.int64)
+        weights = np.asarray(csr.weights, dtype=np.float64)
+        return cls(csr.labels, sources, targets, weights, integral=csr.weight_typecode == 'q')
+
+    def __len__(self):
+        return len(self.labels)
+
+    def weight_value(self, weight):
+        """
+        Convert a float distance back to the graph's weight type.
+        """
+        if self.integral and weight != float('inf'):
+            return int(weight)
+        return weight
+
+
+def _find_cycle(predecessor, vertex, n):
+    """
+    Follow predecessor links from a vertex still improving after n passes.
+    n steps back are guaranteed to end on the cycle; then walk it once.
+    """
+    for _ in range(n):
+        vertex = predecessor[vertex]
+        if vertex < 0:
+            return None
+    cycle = [vertex]
+    current = predecessor[vertex]
+    while current != vertex:
+        cycle.append(current)
+        current = predecessor[current]
+    cycle.reverse()
+    return cycle
+
+
+def bellman_ford_arrays(edges, start):
+    """
+    Bellman-Ford from node id start over an EdgeArray. Every pass relaxes
+    all edges at once against the distances of the previous pass and the
+    loop stops as soon as a pass changes nothing.
+
+    returns (distances, predecessors, passes): NumPy arrays of distances
+    and predecessor ids (-1 for none) and the number of passes that
+    changed something; raises NegativeCycleError when a negative cycle is
+    reachable from start.
+    """
+    n = len(edges)
+    distances = np.full(n, np.inf)
+    predecessors = np.full(n, -1, dtype=np.int64)
+    distances[start] = 0
+    if not len(edges.sources):
+        return distances, predecessors, 0
+
+    sources, targets, weights = edges.sources, edges.targets, edges.weights
+    candidates = np.empty_like(weights)
+    for passes in range(1, n + 1):
+        np.add(distances[sources], weights, out=candidates)
+        best = np.minimum.reduceat(candidates, edges.group_starts)
+        improved = best < distances[edges.group_targets]
+        if not improved.any():
+            return distances, predecessors, passes - 1
+
+        improved_targets = edges.group_targets[improved]
+        distances[improved_targets] = best[improved]
+        tight = (candidates == distances[targets]) & np.isin(targets, improved_targets)
+        predecessors[targets[tight]] = sources[tight]
+
+        if passes == n:
+            for vertex in improved_targets:
+                cycle = _find_cycle(predecessors, int(vertex), n)
+                if cycle is not None:
+                    raise NegativeCycleError([edges.labels[u] for u in cycle])
+    return distances, predecessors, n
+
+
+def bellman_ford_vectorized(graph, start, goal):
+    """
+    Bellman-Ford with NumPy relaxation and early termination.
+
+    param graph: dict, CSRGraph or EdgeArray (build the EdgeArray once to
+    reuse it across queries)
+
+    param start: The starting node
+
+    param goal: The goal node
+
+    returns shortest path, which is presented in a
+    tuple (path: list of nodes, weight); raises NegativeCycleError if a
+    negative cycle is reachable from start
+
+    >>> graph = {'A': [('B', 4), ('C', 1)], 'B': [('D', 1)], 'C': [('B', -2)], 'D': []}
+    >>> bellman_ford_vectorized(graph, 'A', 'D')
+    (['A', 'C', 'B', 'D'], 0)
+    >>> bellman_ford_vectorized({'A': [('B', 1)], 'B': [('A', -2)]}, 'A', 'B')
+    Traceback (most recent call last):
+    ...
+    algorithms.NegativeCycleError: Negative cycle: B -> A -> B
+    """
+    edges = graph if isinstance(graph, EdgeArray) else EdgeArray.from_graph(graph)
+    if start not in edges.index or goal not in edges.index:
+        return [], float('inf')
+    start, goal = edges.index[start], edges.index[goal]
+
+    distances, predecessors, _ = bellman_ford_arrays(edges, start)
+    if distances[goal] == np.inf:
+        return [], float('inf')
+    path = [goal]
+    while path[-1] != start:
+        path.append(int(predecessors[path[-1]]))
+    path.reverse()
+    return [edges.labels[u] for u in path], edges.weight_value(distances[goal].item())
@@ -1,27 +1,190 @@
 '''visualization'''
 
+from collections import OrderedDict
+
 import networkx as nx
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+from csr_graph import as_csr
+
+# Graphs with more nodes than this are drawn in level-of-detail mode.
+LOD_NODES = 500
+# Layouts of the last few graphs, so switching the highlighted path or
+# re-running the algorithms does not recompute them.
+_layouts = OrderedDict()
+_CACHE_SIZE = 4
+
+
+def _edge_arrays(csr, directed):
+    """
+    Source ids, target ids and weights of the edges to draw; an undirected
+    edge stored in both directions is kept once.
+    """
+    offsets = np.asarray(csr.offsets, dtype=np.int64)
+    sources = np.repeat(np.arange(len(csr)), np.diff(offsets))
+    targets = np.asarray(csr.targets, dtype=np.int64)
+    weights = np.asarray(csr.weights, dtype=np.float64)
+    if not directed:
+        pairs = np.minimum(sources, targets) * len(csr) + np.maximum(sources, targets)
+        _, keep = np.unique(pairs, return_index=True)
+        sources, targets, weights = sources[keep], targets[keep], weights[keep]
+    return sources, targets, weights
+
+
+def _force_layout(n, sources, targets, iterations=50, sample=256):
+    """
+    Fruchterman-Reingold in NumPy for graphs too big for the dense
+    networkx layout. Each iteration every vertex is repelled by the same
+    random sample of vertices, scaled up to the whole graph, so an
+    iteration costs O(n * sample) instead of O(n^2).
+    """
+    rng = np.random.default_rng(42)
+    positions = rng.random((n, 2))
+    k = 1 / np.sqrt(n)
+    sample = min(sample, n)
+    temperature = 0.1
+    for _ in range(iterations):
+        x, y = positions[:, 0], positions[:, 1]
+        chosen = rng.choice(n, sample, replace=False)
+        dx = x[:, None] - x[chosen]
+        dy = y[:, None] - y[chosen]
+        force = (k * k * n / sample) / np.maximum(dx * dx + dy * dy, 1e-6)
+        displacement = np.stack(((dx * force).sum(axis=1), (dy * force).sum(axis=1)), axis=1)
+        delta = positions[sources] - positions[targets]
+        pull = delta * (np.hypot(delta[:, 0], delta[:, 1]) / k)[:, None]
+        np.subtract.at(displacement, sources, pull)
+        np.add.at(displacement, targets, pull)
+        length = np.maximum(np.hypot(displacement[:, 0], displacement[:, 1]), 1e-9)
+        positions += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= 0.1 / (iterations + 1)
+    return positions
+
+
+def _spring_positions(n, sources, targets, fixed=None):
+    if n > LOD_NODES and not fixed:
+        return _force_layout(n, sources, targets)
+    G = nx.Graph()
+    G.add_nodes_from(range(n))
+    G.add_edges_from(zip(sources.tolist(), targets.tolist()))
+    if fixed:
+        layout = nx.spring_layout(G, pos=fixed, fixed=list(fixed), seed=42)
+    else:
+        layout = nx.spring_layout(G, seed=42)
+    return np.array([layout[u] for u in range(n)], dtype=np.float64).reshape(n, 2)
+
+
+def _place_missing(positions, missing, sources, targets):
+    """
+    Put nodes without coordinates at the mean position of their placed
+    neighbours, repeating while that places more of them; the rest go to
+    random points of the bounding box.
+    """
+    positions = positions.copy()
+    while missing.any():
+        known = ~missing
+        edges = np.concatenate((np.stack((sources, targets), 1), np.stack((targets, sources), 1)))
+        edges = edges[missing[edges[:, 0]] & known[edges[:, 1]]]
+        if not len(edges):
+            break
+        totals = np.zeros_like(positions)
+        np.add.at(totals, edges[:, 0], positions[edges[:, 1]])
+        counts = np.bincount(edges[:, 0], minlength=len(positions))
+        placed = counts > 0
+        positions[placed] = totals[placed] / counts[placed, None]
+        missing = missing & ~placed
+    if missing.any():
+        known = positions[~missing]
+        low, high = (known.min(0), known.max(0)) if len(known) else (np.zeros(2), np.ones(2))
+        rng = np.random.default_rng(42)
+        positions[missing] = low + rng.random((int(missing.sum()), 2)) * (high - low)
+    return positions
 
 
-def visualize_graph(graph, directed, path):
+def graph_layout(graph, directed=False):
     """
+    Node positions of graph as an (n, 2) array in node id order, plus the
+    CSRGraph they refer to. Coordinates stored in the graph are used as
+    they are; a spring layout places the rest. Results are cached by
+    graph structure.
+
+    >>> from csr_graph import CSRGraph
+    >>> from array import array
+    >>> graph = CSRGraph.from_edge_list([('a', 'b', 1)])
+    >>> graph.coords = array('d', [0, 0, 3, 4])
+    >>> positions, csr = graph_layout(graph)
+    >>> positions.tolist(), graph_layout(graph)[0] is positions
+    ([[0.0, 0.0], [3.0, 4.0]], True)
+    """
+    csr = as_csr(graph)
+    key = (tuple(csr.labels), bytes(csr.offsets), bytes(csr.targets),
+           None if csr.coords is None else bytes(csr.coords))
+    if key in _layouts:
+        _layouts.move_to_end(key)
+        return _layouts[key], csr
+
+    n = len(csr)
+    sources, targets, _ = _edge_arrays(csr, directed)
+    if csr.coords is None:
+        positions = _spring_positions(n, sources, targets)
+    else:
+        positions = np.array(csr.coords, dtype=np.float64).reshape(n, 2)
+        missing = np.isnan(positions).any(axis=1)
+        if missing.any() and n <= LOD_NODES:
+            fixed = {u: positions[u] for u in np.flatnonzero(~missing).tolist()}
+            positions = _spring_positions(n, sources, targets, fixed)
+        elif missing.any():
+            positions = _place_missing(positions, missing, sources, targets)
+
+    _layouts[key] = positions
+    if len(_layouts) > _CACHE_SIZE:
+        _layouts.popitem(last=False)
+    return positions, csr
+
 
+def visualize_graph(graph, directed, path, detail=None):
+    """
+    Draw graph and highlight path.
+
+    param detail: True draws every node and edge label; False uses the
+    level-of-detail mode (all edges in one line collection, no edge
+    labels, only the path and its neighbourhood in detail). None picks
+    the mode by graph size.
+
+    >>> import matplotlib
+    >>> matplotlib.use('Agg')
     >>> graph = {
     ...     'a': [('b', 3.0), ('c', 1.0)],
     ...     'b': [('a', 3.0), ('d', 2.0)],
     ...     'c': [('a', 1.0), ('d', 4.0)],
     ...     'd': [('b', 2.0), ('c', 4.0)]
     ... }
-    >>> visualize_graph(graph, path=['a', 'b', 'd'])
+    >>> visualize_graph(graph, directed=False, path=['a', 'b', 'd'])
+    >>> visualize_graph(graph, directed=False, path=['a', 'b', 'd'], detail=False)
     """
-    G = nx.DiGraph() if directed else nx.Graph()
+    positions, csr = graph_layout(graph, directed)
+    if detail is None:
+        detail = len(csr) <= LOD_NODES
+    if detail:
+        _draw_detailed(csr, positions, directed, path)
+    else:
+        _draw_overview(csr, positions, directed, path)
+
+    plt.title('Візуалізація графу')
+    plt.axis('off')
+    plt.tight_layout()
+    plt.show()
+
 
-    for u in graph:
-        for v, w in graph[u]:
+def _draw_detailed(csr, positions, directed, path):
+    G = nx.DiGraph() if directed else nx.Graph()
+    G.add_nodes_from(csr.labels)
+    for u in csr:
+        for v, w in csr[u]:
             G.add_edge(u, v, weight=w)
 
-    pos = nx.spring_layout(G, seed=42)
+    pos = {label: positions[u] for u, label in enumerate(csr.labels)}
 
     plt.figure(figsize=(10, 8))
 
@@ -80,7 +243,35 @@ def visualize_graph(graph, directed, path):
             )
             nx.draw_networkx_labels(G, pos, font_size=12, font_weight='bold')
 
-    plt.title('Візуалізація графу')
-    plt.axis('off')
-    plt.tight_layout()
-    plt.show()
+
+def _draw_overview(csr, positions, directed, path):
+    """
+    Level-of-detail drawing: every edge as one faint line collection and
+    every node as one scatter; only the path, its vertices and their
+    neighbours are drawn prominently, and only path vertices are labelled.
+    """
+    sources, targets, _ = _edge_arrays(csr, directed)
+    segments = np.stack((positions[sources], positions[targets]), axis=1)
+
+    plt.figure(figsize=(10, 8))
+    axes = plt.gca()
+    axes.add_collection(LineCollection(segments, colors='lightgray', linewidths=0.3))
+    axes.scatter(positions[:, 0], positions[:, 1], s=2, c='steelblue', linewidths=0)
+
+    path_ids = np.array([csr.index[label] for label in path or [] if label in csr.index],
+                        dtype=np.int64)
+    if len(path_ids):
+        touching = np.isin(sources, path_ids) | np.isin(targets, path_ids)
+        axes.add_collection(LineCollection(segments[touching], colors='gray', linewidths=0.8))
+        neighbourhood = np.union1d(sources[touching], targets[touching])
+        axes.scatter(positions[neighbourhood, 0], positions[neighbourhood, 1], s=12,
+                     c='lightblue', edgecolors='gray', linewidths=0.5)
+
+        path_segments = np.stack((positions[path_ids[:-1]], positions[path_ids[1:]]), axis=1)
+        axes.add_collection(LineCollection(path_segments, colors='red', linewidths=2.5))
+        axes.scatter(positions[path_ids, 0], positions[path_ids, 1], s=40, c='yellow',
+                     edgecolors='black', linewidths=0.5, zorder=3)
+        for u in path_ids.tolist():
+            axes.annotate(str(csr.labels[u]), positions[u], fontsize=8,
+                          xytext=(3, 3), textcoords='offset points')
+    axes.autoscale_view()